@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+Micro-benchmark of the detail page parsing over the saved pages of benchmarks/fixtures.
+
+It compares the previous parsing (a full html.parser tree walked by six extractors) with
+MobileAssistant360._parse_details, for each available parser backend, and checks that all
+of them return the same information.
+
+Usage: python benchmarks/bench_details.py [--number N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+import bs4
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from mobile_assistant_360.market import MobileAssistant360, _default_html_parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _base_info_td(bsoup, index):
+    base_info = bsoup.find(attrs={"class": "base-info"})
+    if base_info is not None:
+        tbody = base_info.find("tbody")
+        if tbody is not None:
+            td = tbody.find_all("td")
+            if len(td) > index and isinstance(td[index], bs4.element.Tag) and len(td[index].contents) > 1:
+                if isinstance(td[index].contents[1], str):
+                    return td[index].contents[1]
+    return None
+
+
+def legacy_parse_details(html):
+    """
+    The detail page parsing as done before the single pass extractor
+    """
+    result = {}
+    bsoup = BeautifulSoup(html, "html.parser")
+    app_name = bsoup.find(attrs={"id": "app-name"})
+    if app_name is not None and app_name.span is not None and isinstance(app_name.span.get('title'), str):
+        result["Name"] = app_name.span['title']
+    s_1 = bsoup.find(attrs={"class": "s-1"})
+    if s_1 is not None and len(s_1.contents) > 0 and isinstance(s_1.contents[0], str):
+        result["Rating"] = s_1.contents[0]
+    for index, key in enumerate(("Creator", "LastUpdate", "Version")):
+        value = _base_info_td(bsoup, index)
+        if value is not None:
+            result[key] = value
+    s_3 = bsoup.find_all(attrs={"class": "s-3"})
+    if len(s_3) > 1 and isinstance(s_3[1].string, str):
+        result["Size"] = s_3[1].string
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detail page parsing.")
+    parser.add_argument("--number", type=int, default=200, help="number of parses per measure")
+    args = parser.parse_args()
+    backends = ["html.parser"]
+    if _default_html_parser() != "html.parser":
+        backends.append(_default_html_parser())
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "detail_*.html"))):
+        with open(path, encoding="utf-8") as file:
+            html = file.read()
+        expected = legacy_parse_details(html)
+        legacy = timeit.timeit(lambda: legacy_parse_details(html), number=args.number) / args.number
+        print("{} ({} bytes)".format(os.path.basename(path), len(html.encode())))
+        print("    {:<28} {:8.3f} ms".format("legacy html.parser", legacy * 1000))
+        for backend in backends:
+            if MobileAssistant360._parse_details(html, backend) != expected:
+                raise AssertionError("{} returns different details for {}".format(backend, path))
+            elapsed = timeit.timeit(lambda: MobileAssistant360._parse_details(html, backend),
+                                    number=args.number) / args.number
+            print("    {:<28} {:8.3f} ms  x{:.1f}".format("single pass " + backend, elapsed * 1000,
+                                                        legacy / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Cold start benchmark of the package and of its command line interface.
+
+Each measure runs in a fresh interpreter: the import time of mobile_assistant_360.market is read from
+python -X importtime, and the start time of the CLI is the wall time of python -m mobile_assistant_360 --help minus
+the one of an empty interpreter. It also checks that none of the heavy dependencies is imported on these paths,
+and exits with an error when the median CLI start time exceeds the budget.
+
+Usage: python benchmarks/bench_import.py [--number N] [--budget MS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "lxml", "clint", "aiohttp", "pyarrow")
+
+
+def run(arguments):
+    environment = dict(os.environ, PYTHONPATH=os.path.abspath(ROOT))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable] + arguments, env=environment, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return time.perf_counter() - start, process.stderr
+
+
+def imported_modules(importtime):
+    """
+    Map each module of a python -X importtime output to its cumulative import time in seconds
+    """
+    result = {}
+    for line in importtime.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                result[name.strip()] = int(cumulative) / 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the package and of its CLI.")
+    parser.add_argument("--number", type=int, default=10, help="number of measures")
+    parser.add_argument("--budget", type=float, default=50.0, help="max median CLI start time, in milliseconds")
+    args = parser.parse_args()
+    measures = {"market import": [], "CLI start": []}
+    heavy = set()
+    for _ in range(args.number):
+        _, importtime = run(["-X", "importtime", "-c", "import mobile_assistant_360.market"])
+        modules = imported_modules(importtime)
+        measures["market import"].append(modules["mobile_assistant_360.market"])
+        heavy.update(name.split(".")[0] for name in modules if name.split(".")[0] in HEAVY_MODULES)
+        baseline, _ = run(["-c", "pass"])
+        cli, _ = run(["-m", "mobile_assistant_360", "--help"])
+        measures["CLI start"].append(cli - baseline)
+    _, importtime = run(["-X", "importtime", "-m", "mobile_assistant_360", "--help"])
+    heavy.update(name.split(".")[0] for name in imported_modules(importtime)
+                 if name.split(".")[0] in HEAVY_MODULES)
+    for name, values in measures.items():
+        print("    {:<16} median {:8.1f} ms  min {:8.1f} ms".format(name, statistics.median(values) * 1000,
+                                                                     min(values) * 1000))
+    if heavy:
+        print("Heavy modules imported at start: {}".format(", ".join(sorted(heavy))))
+    median = statistics.median(measures["CLI start"]) * 1000
+    if heavy or median > args.budget:
+        print("The CLI start is over the budget of {:.0f} ms.".format(args.budget) if median > args.budget else
+              "The heavy dependencies must be imported lazily.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Benchmark of the page parsing in the fetching threads against the parsing in a pool of processes (parse_workers).
+
+The pages served by the stub store (search, category and detail pages) are parsed by several threads, as done by
+the prefetching of search and browse or by crawl_catalog, once inline and once by the parser processes, and the
+results of both are checked to be identical and in the same order.
+
+Usage: python benchmarks/bench_parse_pool.py [--pages N] [--threads N] [--parse-workers N] [--html-parser NAME]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from benchmarks.stub_store import StubStore
+from mobile_assistant_360.market import MobileAssistant360
+
+
+def load_pages(number):
+    store = StubStore(pages=number)
+    try:
+        pages = []
+        for page in range(1, number + 1):
+            pages.append((MobileAssistant360._parse_search_page,
+                          store.page("/search/index/?kw=benchmark&page={}".format(page)), ()))
+            pages.append((MobileAssistant360._parse_category_page,
+                          store.page("/list/index/cid/11?page={}".format(page)), (page,)))
+            pages.append((MobileAssistant360._parse_details,
+                          store.page("/detail/index/soft_id/{}".format(page)), ()))
+        return pages
+    finally:
+        store.stop()
+
+
+def parse_all(market, pages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        result = list(executor.map(lambda page: market._parse(page[0], page[1], *page[2]), pages))
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parsing in a pool of processes.")
+    parser.add_argument("--pages", type=int, default=100, help="number of pages of each type")
+    parser.add_argument("--threads", type=int, default=8, help="number of fetching threads")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count(), help="number of parser processes")
+    parser.add_argument("--html-parser", default=None, help="BeautifulSoup parser backend, the default one if None")
+    args = parser.parse_args()
+    pages = load_pages(args.pages)
+    inline = MobileAssistant360(html_parser=args.html_parser)
+    pooled = MobileAssistant360(html_parser=args.html_parser, parse_workers=args.parse_workers)
+    try:
+        # The parser processes are started before the measure.
+        parse_all(pooled, pages[:args.parse_workers], args.parse_workers)
+        expected, inline_time = parse_all(inline, pages, args.threads)
+        result, pooled_time = parse_all(pooled, pages, args.threads)
+    finally:
+        pooled.close()
+    if result != expected:
+        raise AssertionError("The parser processes return different results")
+    print("{} pages, {} threads, {} backend".format(len(pages), args.threads, inline._html_parser))
+    print("    {:<28} {:8.3f} s {:10.1f} pages/s".format("inline", inline_time, len(pages) / inline_time))
+    print("    {:<28} {:8.3f} s {:10.1f} pages/s  x{:.1f}".format(
+        "{} parser processes".format(args.parse_workers), pooled_time, len(pages) / pooled_time,
+        inline_time / pooled_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+Memory benchmark of the application records against the per-app dicts they replace.
+
+It builds the same applications, as returned by browse and then merged with their details by download,
+once as dicts and once as AppRecord, and reports the memory held by each representation.
+
+Usage: python benchmarks/bench_records.py [--number N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from mobile_assistant_360.record import AppRecord
+
+
+def listing(index):
+    package = "com.example.app{}".format(index)
+    return {
+        "Name": "应用{}".format(index),
+        "ApkName": "{}_{}.apk".format(package, 100 + index % 50),
+        "PackageName": package,
+        "Version": str(100 + index % 50),
+        "AppId": str(1000000 + index),
+        "Downloads": "{}万次下载".format(index % 9999),
+        "DownloadLink": "http://shouji.360tpcdn.com/170101/abcdef/{}_{}.apk".format(package, 100 + index % 50),
+    }
+
+
+def details(index):
+    return {
+        "Rating": "8.{}".format(index % 10),
+        "Creator": "开发者{}".format(index % 500),
+        "LastUpdate": "2020-01-{:02d}".format(index % 28 + 1),
+        "Version": "1.{}.{}".format(index % 10, index % 7),
+        "Size": "{}.5M".format(index % 90),
+    }
+
+
+def measure(build, number):
+    # The strings are built beforehand so that only the containers are measured.
+    data = [(listing(index), details(index)) for index in range(number)]
+    start = time.perf_counter()
+    build(data)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    apps = build(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return apps, size, elapsed
+
+
+def build_dicts(data):
+    apps = [dict(app) for app, _ in data]
+    return [{**app, **info} for app, (_, info) in zip(apps, data)]
+
+
+def build_records(data):
+    apps = [AppRecord(app) for app, _ in data]
+    for app, (_, info) in zip(apps, data):
+        app.update(info)
+    return apps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the application records.")
+    parser.add_argument("--number", type=int, default=100000, help="number of applications")
+    args = parser.parse_args()
+    dicts, dicts_size, dicts_time = measure(build_dicts, args.number)
+    records, records_size, records_time = measure(build_records, args.number)
+    if [record.to_dict() for record in records] != dicts:
+        raise AssertionError("The records are different from the dicts")
+    print("{} applications".format(args.number))
+    print("    {:<10} {:10.1f} MiB {:8.0f} bytes/app {:8.3f} s".format("dict", dicts_size / (1 << 20),
+                                                                        dicts_size / args.number, dicts_time))
+    print("    {:<10} {:10.1f} MiB {:8.0f} bytes/app {:8.3f} s  x{:.1f} smaller"
+          .format("AppRecord", records_size / (1 << 20), records_size / args.number, records_time,
+                  dicts_size / records_size))
+
+
+if __name__ == "__main__":
+    main()
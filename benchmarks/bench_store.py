@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""
+End to end benchmark of search, browse, list_categories and download against the local stub store.
+
+The stub (benchmarks/stub_store.py) runs in its own process, with the configured latency and bandwidth, and each
+scenario runs in a fresh process so that its peak RSS is its own. For every scenario it reports the fetched
+pages per second, the parse time per page, the downloads per second and the peak RSS.
+
+Usage: python benchmarks/bench_store.py [--pages N] [--latency MS] [--bandwidth MIB/S] [--apk-size MIB]
+                                        [--downloads N] [--workers N] [--html-parser NAME] [--json PATH]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from benchmarks.stub_store import StubStore
+
+SCENARIOS = ("search", "browse", "list_categories", "download")
+
+
+def serve(port, pages, latency, bandwidth, apk_size, ready):
+    store = StubStore(port, pages, latency, bandwidth, apk_size)
+    ready.put(store.url)
+    store.serve_forever()
+
+
+def parse_timer():
+    """
+    An instrumentation collecting the parse time of each page
+    """
+    from mobile_assistant_360.metrics import Instrumentation
+
+    parse_times = []
+
+    class ParseTimer(Instrumentation):
+        def parse(self, page, seconds):
+            parse_times.append(seconds)
+
+    return ParseTimer(), parse_times
+
+
+def run_scenario(scenario, url, args):
+    from mobile_assistant_360.market import MobileAssistant360
+
+    instrumentation, parse_times = parse_timer()
+    folder = tempfile.mkdtemp()
+    try:
+        market = MobileAssistant360(folder, base_url=url, html_parser=args.html_parser, prefetch=args.prefetch,
+                                    instrumentation=instrumentation)
+        downloaded = 0
+        start = time.perf_counter()
+        if scenario == "search":
+            items = len(market.search("benchmark", nb_result=None))
+        elif scenario == "browse":
+            items = len(market.browse("11"))
+        elif scenario == "list_categories":
+            items = sum(len(market.list_categories()) for _ in range(args.repeat))
+        else:
+            # The whole category is browsed so that no prefetched page is parsed during the downloads.
+            applications = market.browse("11")[:args.downloads]
+            parse_times.clear()
+            start = time.perf_counter()
+            items = len(applications)
+            downloaded = len(market.download(applications, workers=args.workers, progress=None))
+        elapsed = time.perf_counter() - start
+        market.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "scenario": scenario,
+        "items": items,
+        "pages": len(parse_times),
+        "seconds": elapsed,
+        "pages_per_second": len(parse_times) / elapsed,
+        "parse_ms_per_page": 1000 * sum(parse_times) / len(parse_times) if parse_times else 0.0,
+        "downloads": downloaded,
+        "downloads_per_second": downloaded / elapsed,
+        "mib_per_second": downloaded * args.apk_size / elapsed,
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the client against the local stub store.")
+    parser.add_argument("--pages", type=int, default=10,
+                        help="number of result pages of the searches and categories")
+    parser.add_argument("--latency", type=float, default=20.0, help="latency of each response, in milliseconds")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bandwidth of each APK transfer, in MiB/s")
+    parser.add_argument("--apk-size", type=float, default=4.0, help="size of the synthetic APKs, in MiB")
+    parser.add_argument("--downloads", type=int, default=20, help="number of downloaded applications")
+    parser.add_argument("--workers", type=int, default=4, help="number of download workers")
+    parser.add_argument("--prefetch", type=int, default=4, help="number of result pages requested ahead")
+    parser.add_argument("--repeat", type=int, default=20, help="number of list_categories calls")
+    parser.add_argument("--html-parser", default=None, help="BeautifulSoup parser backend, the default one if None")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="scenario to run, all by default")
+    parser.add_argument("--json", help="path of a JSON file where the results are written")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    stub = context.Process(target=serve, args=(0, args.pages, args.latency / 1000,
+                                               args.bandwidth * (1 << 20) if args.bandwidth else None,
+                                               int(args.apk_size * (1 << 20)), ready), daemon=True)
+    stub.start()
+    results = []
+    try:
+        url = ready.get(timeout=30)
+        print("{} pages, {:.0f} ms latency, {} bandwidth, {:.1f} MiB APKs".format(
+            args.pages, args.latency, "{:.1f} MiB/s".format(args.bandwidth) if args.bandwidth else "unlimited",
+            args.apk_size))
+        print("    {:<16} {:>6} {:>10} {:>14} {:>12} {:>10} {:>10}".format(
+            "scenario", "pages", "pages/s", "parse ms/page", "downloads/s", "MiB/s", "peak RSS"))
+        for scenario in args.scenario or SCENARIOS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_scenario, scenario, url, args).result()
+            results.append(result)
+            print("    {scenario:<16} {pages:>6} {pages_per_second:>10.1f} {parse_ms_per_page:>14.3f}"
+                  " {downloads_per_second:>12.2f} {mib_per_second:>10.1f} {peak_rss_mib:>7.1f} MiB"
+                  .format(**result))
+    finally:
+        stub.terminate()
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"settings": vars(args), "results": results}, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
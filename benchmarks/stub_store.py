@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+"""
+A local stub of the 360 mobile assistant store, serving the saved pages of benchmarks/fixtures and synthetic APKs.
+
+Every result page of a search or a category serves the same saved page, with the application ids and the APK
+names made unique per page, until the last page after which the empty result page is served. The APK links point
+to the stub, which streams deterministic payloads of the configured size. A latency is added to every response
+and the APK transfers can be limited to a bandwidth.
+
+Usage: python benchmarks/stub_store.py [--port PORT] [--pages N] [--latency MS] [--bandwidth MIB/S] [--apk-size MIB]
+"""
+
+import argparse
+import http.server
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_CDN = "http://shouji.360tpcdn.com/"
+_SID = re.compile(r'(sid="|softid=|soft_id/)(\d+)')
+_APK = re.compile(r"/([\w.]+)_(\d+)\.apk")
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+class StubStore(object):
+    """
+    The stub store, served by a thread until stop is called.
+    """
+
+    _CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, port=0, pages=5, latency=0.0, bandwidth=None, apk_size=1 << 20):
+        """
+        :param port: The port of the stub on 127.0.0.1, a free one if 0
+        :type port: int
+        :param pages: The number of non empty result pages of each search and category
+        :type pages: int
+        :param latency: The time waited before each response, in seconds
+        :type latency: float
+        :param bandwidth: The max speed of each APK transfer in bytes per second, None for no limit
+        :type bandwidth: float
+        :param apk_size: The size of the synthetic APKs, in bytes
+        :type apk_size: int
+        """
+        self.pages = pages
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.apk = (bytes(range(256)) * (apk_size // 256 + 1))[:apk_size]
+        self._fixtures = {name: _read_fixture(name + ".html") for name in
+                          ("search_page", "search_empty", "category_page", "category_empty", "categories",
+                           "detail_wechat")}
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _result_page(self, name, page):
+        """
+        The saved result page with ids and APK names unique to this page and links to the stub
+        """
+        if page > self.pages:
+            return self._fixtures[name + "_empty"]
+        html = self._fixtures[name + "_page"].replace(_CDN, self.url + "/apk/")
+        html = _SID.sub(lambda match: "{}{}{:04d}".format(match.group(1), match.group(2), page), html)
+        return _APK.sub(lambda match: "/{}.p{}_{}.apk".format(match.group(1), page, match.group(2)), html)
+
+    def page(self, path):
+        """
+        :return: The html served for a path, None if unknown
+        """
+        url = urlparse(path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        if url.path.startswith("/search/index/"):
+            return self._result_page("search", page)
+        if url.path.startswith("/list/index/cid/"):
+            return self._result_page("category", page) if "page=" in url.query else self._fixtures["categories"]
+        if url.path.startswith("/detail/index/soft_id/"):
+            return self._fixtures["detail_wechat"]
+        return None
+
+    def _handler(self):
+        store = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if store.latency:
+                    time.sleep(store.latency)
+                if self.path.startswith("/apk/") and self.path.endswith(".apk"):
+                    self._send_apk()
+                    return
+                html = store.page(self.path)
+                if html is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_apk(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/vnd.android.package-archive")
+                self.send_header("Content-Length", str(len(store.apk)))
+                self.end_headers()
+                start = time.monotonic()
+                for offset in range(0, len(store.apk), store._CHUNK_SIZE):
+                    chunk = store.apk[offset:offset + store._CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    if store.bandwidth:
+                        wait = start + (offset + len(chunk)) / store.bandwidth - time.monotonic()
+                        if wait > 0:
+                            time.sleep(wait)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stub of the 360 mobile assistant store.")
+    parser.add_argument("--port", type=int, default=8360, help="port on 127.0.0.1")
+    parser.add_argument("--pages", type=int, default=5, help="number of result pages of each search and category")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of each response, in milliseconds")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bandwidth of each APK transfer, in MiB/s")
+    parser.add_argument("--apk-size", type=float, default=1.0, help="size of the synthetic APKs, in MiB")
+    args = parser.parse_args()
+    store = StubStore(args.port, args.pages, args.latency / 1000,
+                      args.bandwidth * (1 << 20) if args.bandwidth else None, int(args.apk_size * (1 << 20)))
+    print("Serving the stub store on {}".format(store.url))
+    try:
+        store.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+The command line interface of the 360 mobile assistant store client.
+
+The applications are written to the standard output as JSON Lines, which download and sync read back from a file
+or from the standard input, e.g.:
+
+    python -m mobile_assistant_360 search wechat -n 10 | python -m mobile_assistant_360 download --folder apks
+"""
+
+import argparse
+import json
+import sys
+
+from mobile_assistant_360.market import MobileAssistant360
+
+
+def _create_client(args):
+    options = {"base_url": args.base_url, "requests_per_second": args.requests_per_second,
+               "html_parser": args.html_parser}
+    if args.index is not None:
+        from mobile_assistant_360.index import LocalIndex
+
+        options["local_index"] = LocalIndex(args.index)
+    if args.manifest is not None:
+        from mobile_assistant_360.manifest import Manifest
+
+        options["manifest"] = Manifest(args.manifest)
+        options["info_files"] = not args.no_info_files
+    return MobileAssistant360(args.folder, **options)
+
+
+def _write_applications(applications):
+    for application in applications:
+        sys.stdout.write(json.dumps(dict(application), ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _read_applications(path):
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [json.loads(line) for line in file if line.strip()]
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def _search(client, args):
+    _write_applications(client.iter_search(args.keyword, args.number, "local" if args.local else "remote"))
+
+
+def _browse(client, args):
+    _write_applications(client.iter_browse(args.category, args.number))
+
+
+def _categories(client, args):
+    _write_applications(client.list_categories())
+
+
+def _download(client, args):
+    download = client.sync if args.command == "sync" else client.download
+    _write_applications(download(_read_applications(args.input), workers=args.workers, segments=args.segments,
+                                 progress=None if args.progress == "none" else args.progress,
+                                 max_bytes=args.max_bytes, min_free_space=args.min_free_space))
+
+
+def _create_parser():
+    parser = argparse.ArgumentParser(prog="python -m mobile_assistant_360",
+                                     description="Search, browse and download applications of the 360 mobile "
+                                                 "assistant store.")
+    parser.add_argument("--folder", default="./", help="download folder (default: current directory)")
+    parser.add_argument("--base-url", help="url of the store")
+    parser.add_argument("--requests-per-second", type=float, help="max number of requests per second")
+    parser.add_argument("--html-parser", help="BeautifulSoup parser backend, lxml if installed or html.parser")
+    parser.add_argument("--index",
+                        help="local index fed with the downloaded applications and used by search --local")
+    parser.add_argument("--manifest", help="JSON Lines manifest where the downloaded applications are appended")
+    parser.add_argument("--no-info-files", action="store_true", help="do not write info files, with --manifest")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="search applications by keyword")
+    search.add_argument("keyword")
+    search.add_argument("-n", "--number", type=int, default=50, help="max number of applications (default: 50)")
+    search.add_argument("--local", action="store_true", help="search the names of the local index given by --index")
+    search.set_defaults(function=_search)
+
+    browse = commands.add_parser("browse", help="list the applications of a category")
+    browse.add_argument("category", help="the CatID of the category")
+    browse.add_argument("-n", "--number", type=int, help="max number of applications (default: all)")
+    browse.set_defaults(function=_browse)
+
+    categories = commands.add_parser("categories", help="list the categories")
+    categories.set_defaults(function=_categories)
+
+    for name, description in (("download", "download applications"),
+                              ("sync", "download the applications missing from the folder or newer")):
+        download = commands.add_parser(name, help=description)
+        download.add_argument("input", nargs="?", default="-",
+                              help="JSON Lines file of applications, as written by search or browse "
+                                   "(default: stdin)")
+        download.add_argument("--workers", type=int, default=1, help="number of parallel downloads (default: 1)")
+        download.add_argument("--segments", type=int, default=1, help="byte-range segments per APK (default: 1)")
+        download.add_argument("--progress", choices=("bar", "quiet", "none"), default="quiet",
+                              help="progress display on stderr (default: quiet)")
+        download.add_argument("--max-bytes", type=int, help="max number of bytes downloaded (default: no limit)")
+        download.add_argument("--min-free-space", type=int, default=0,
+                              help="bytes kept free on the disk of the download folder (default: 0)")
+        download.set_defaults(function=_download)
+    return parser
+
+
+def main(argv=None):
+    parser = _create_parser()
+    args = parser.parse_args(argv)
+    if args.command == "search" and args.local and args.index is None:
+        parser.error("search --local requires --index")
+    client = _create_client(args)
+    try:
+        args.function(client, args)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+#!/usr/bin/python3
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from mobile_assistant_360.market import MobileAssistant360, _default_html_parser
+from mobile_assistant_360.metrics import Instrumentation
+from mobile_assistant_360.scheduler import DownloadScheduler
+
+
+class AsyncMobileAssistant360(MobileAssistant360):
+    """
+    The asyncio client of the 360 mobile assistant store, on an aiohttp transport.
+    It shares the parsing and the download folder layout of MobileAssistant360, so both clients return the same
+    results. The number of requests in flight is bounded and every coroutine can be cancelled.
+    Every request method is a coroutine. crawl_catalog, the rate limiter and the circuit breaker of
+    MobileAssistant360 are not available on this transport. The APK files are written and hashed in the default
+    executor, so the event loop is not blocked by the disk.
+    """
+
+    def __init__(self, download_folder="./", session=None, base_url=None, concurrency=10, per_host=None,
+                 timeout=60, prefetch=4, html_parser=None, details_cache=None, response_cache=None,
+                 instrumentation=None, parse_workers=None, manifest=None, info_files=True, local_index=None):
+        """
+        :param download_folder: Path of the download folder
+        :type download_folder: str
+        :param session: An aiohttp session used for every request, created on first use if None
+        :type session: aiohttp.ClientSession
+        :param base_url: The url of the store, the official store is used if None
+        :type base_url: str
+        :param concurrency: The max number of requests in flight
+        :type concurrency: int
+        :param per_host: The max number of connections to the same host of the created session, None for no limit
+        :type per_host: int
+        :param timeout: The total timeout of each page request, and the max time to connect or between two reads
+        of an APK transfer, which has no total timeout, in seconds
+        :type timeout: float
+        :param prefetch: The number of result pages requested ahead by search and browse, 1 to disable
+        :type prefetch: int
+        :param html_parser: The BeautifulSoup parser backend, lxml if installed or html.parser if None
+        :type html_parser: str
+        :param details_cache: A cache of the application details used by get_details and download
+        :type details_cache: DetailsCache
+        :param response_cache: A cache revalidating the search, category and category list pages
+        :type response_cache: ResponseCache
+        :param instrumentation: The instrumentation notified of the requests, parses, cache lookups and APK
+                                transfers
+        :type instrumentation: Instrumentation
+        :param parse_workers: The number of processes parsing the fetched pages, None to parse them in the event
+                              loop. The processes are spawned, so the main module of a script must be importable.
+        :type parse_workers: int
+        :param manifest: A manifest where the downloaded applications are appended
+        :type manifest: Manifest
+        :param info_files: Whether an info file is written next to each downloaded APK
+        :type info_files: bool
+        :param local_index: An offline index fed with the downloaded applications
+        :type local_index: LocalIndex
+        """
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError("Error: concurrency must be a positive integer")
+        if not isinstance(prefetch, int) or prefetch < 1:
+            raise ValueError("Error: prefetch must be a positive integer")
+        self._download_folder = download_folder
+        if base_url is not None:
+            self._BASE = base_url.rstrip("/")
+        self._session = session
+        self._own_session = session is None
+        self._concurrency = concurrency
+        self._per_host = per_host
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._transfer_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        self._semaphore = None
+        self._prefetch = prefetch
+        self._html_parser = html_parser if html_parser is not None else _default_html_parser()
+        self._details_cache = details_cache
+        self._response_cache = response_cache
+        self._instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self._manifest = manifest
+        self._info_files = info_files
+        self._local_index = local_index
+        # The throttling of the requests of MobileAssistant360 is not used by the aiohttp transport.
+        self._rate_limiter = None
+        self._circuit_breaker = None
+        self._throttle_retries = 0
+        if parse_workers is not None and (not isinstance(parse_workers, int) or parse_workers < 1):
+            raise ValueError("Error: parse_workers must be a positive integer or None")
+        self._parse_workers = parse_workers
+        self._parser_pool = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._concurrency, limit_per_host=self._per_host or 0)
+            self._session = aiohttp.ClientSession(connector=connector)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._session
+
+    async def close(self):
+        """
+        Close the session if it has been created by the client and stop the parser processes.
+        """
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._parser_pool is not None:
+            self._parser_pool.shutdown()
+            self._parser_pool = None
+
+    async def _parse(self, parse, html, *args):
+        """
+        Parse a page with the classmethod parse(html, html_parser, *args), in the parser processes if any, and
+        report the parse duration.
+        """
+        start = time.perf_counter()
+        if self._parse_workers is None:
+            parsed = parse(html, self._html_parser, *args)
+        else:
+            if self._parser_pool is None:
+                self._parser_pool = ProcessPoolExecutor(max_workers=self._parse_workers,
+                                                        mp_context=multiprocessing.get_context("spawn"))
+            parsed = await asyncio.wrap_future(self._parser_pool.submit(parse, html, self._html_parser, *args))
+        self._instrumentation.parse(parse.__name__[len("_parse_"):], time.perf_counter() - start)
+        return parsed
+
+    async def _get_parsed_page(self, url, parse, *args):
+        session = self._get_session()
+        entry = self._response_cache.get(url) if self._response_cache is not None else None
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+        async with self._semaphore:
+            text, status, headers = await self._fetch(session, url, headers=headers)
+        if self._response_cache is not None:
+            self._instrumentation.cache("response", status == 304 and entry is not None)
+        if status == 304 and entry is not None:
+            self._response_cache.revalidated(url)
+            if entry.parsed is not None:
+                return self._restore_parsed(entry.parsed)
+            parsed = await self._parse(parse, entry.body, *args)
+            if parsed is not None:
+                self._response_cache.set_parsed(url, parsed)
+            return parsed
+        if status != 200:
+            self._display_error("An error occurred with the url \"{}\".\nStatus code: {}.".format(url, status))
+            return None
+        parsed = await self._parse(parse, text, *args)
+        if self._response_cache is not None:
+            self._response_cache.set(url, text, headers.get("ETag"), headers.get("Last-Modified"), parsed)
+        return parsed
+
+    async def _fetch(self, session, url, **kwargs):
+        """
+        Get a page and report the request, returning its text (None if the status code is not 200), its status code
+        and its headers.
+        """
+        start = time.perf_counter()
+        try:
+            async with session.get(url, timeout=self._timeout, **kwargs) as req:
+                body = await req.read() if req.status == 200 else b""
+                text = await req.text() if req.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._instrumentation.request(url, None, time.perf_counter() - start, 0, 0)
+            raise
+        self._instrumentation.request(url, req.status, time.perf_counter() - start, len(body), 0)
+        return text, req.status, req.headers
+
+    async def _get_page(self, url, error, parse, *args):
+        try:
+            return await self._get_parsed_page(url, parse, *args)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._display_error(error)
+            return None
+
+    async def _get_page_apps(self, keyword, page):
+        search_url = self._BASE + self._SEARCH + keyword + "&page={}".format(page)
+        return await self._get_page(search_url, "An error occurred with the url '{}'.".format(search_url),
+                                    self._parse_search_page)
+
+    async def _get_category_page_apps(self, category, page):
+        category_url = self._BASE + self._CATEGORY + category + "?page={}".format(page)
+        return await self._get_page(category_url, "An error occurred with the url '{}'.".format(category_url),
+                                    self._parse_category_page, page)
+
+    async def _get_categories_from_url(self, url):
+        return await self._get_page(url, "An error occurred with the url '{}' while getting the categories."
+                                    .format(url), self._parse_categories, url)
+
+    async def _iter_pages(self, get_page, key):
+        pending = deque()
+        try:
+            for page in range(1, self._prefetch + 1):
+                pending.append(asyncio.ensure_future(get_page(key, page)))
+            page = self._prefetch + 1
+            while True:
+                apps = await pending.popleft()
+                if apps is None or len(apps) <= 0:
+                    return
+                pending.append(asyncio.ensure_future(get_page(key, page)))
+                page += 1
+                yield apps
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _iter_apps(self, get_page, key, nb_result):
+        if nb_result is not None and nb_result <= 0:
+            return
+        count = 0
+        pages = self._iter_pages(get_page, key)
+        try:
+            async for apps in pages:
+                if nb_result is not None:
+                    apps = apps[:nb_result - count]
+                for app in apps:
+                    count += 1
+                    yield app
+                if nb_result is not None and count >= nb_result:
+                    return
+        finally:
+            await pages.aclose()
+
+    def iter_search(self, keyword, nb_result=None):
+        """
+        Search applications according to a given keyword, yielding them as soon as each result page is parsed.
+
+        :param keyword: A keyword used to search applications
+        :type keyword: str
+        :param nb_result: An integer corresponding to the limit number of yielded application, None for no limit
+        :type nb_result: int
+        :return: An asynchronous generator of the applications found
+        :rtype: async_generator
+        """
+        if type(keyword) is not str:
+            raise TypeError("Error: keyword must be a string")
+        return self._iter_apps(self._get_page_apps, keyword, nb_result)
+
+    async def search(self, keyword, nb_result=50):
+        """
+        Search applications according to a given keyword.
+
+        :param keyword: A keyword used to search applications
+        :type keyword: str
+        :param nb_result: An integer corresponding to the limit number of application in the returned list
+        :type nb_result: int
+        :return: A list of applications found
+        :rtype: list
+        """
+        return [app async for app in self.iter_search(keyword, nb_result)]
+
+    def iter_browse(self, category, nb_result=None):
+        """
+        Browse a category, yielding the applications as soon as each category page is parsed.
+        :param category: The ID of the category
+        :param nb_result: The max number of yielded application
+        :return: An asynchronous generator of application
+        """
+        if not isinstance(category, str):
+            raise TypeError("Error: category must be a string corresponding to a catID.")
+        return self._iter_apps(self._get_category_page_apps, category, nb_result)
+
+    async def browse(self, category, nb_result=None):
+        """
+        Browse a category
+        :param category: The ID of the category
+        :param nb_result: The max number of result
+        :return: A list of application
+        """
+        return [app async for app in self.iter_browse(category, nb_result)]
+
+    async def list_categories(self):
+        """
+        List the existing categories.
+        :return: A list of category
+        """
+        result = []
+        urls = [self._BASE + self._CATEGORY + cat_id for cat_id in self._CATEGORIES_ID]
+        for ret in await asyncio.gather(*[self._get_categories_from_url(url) for url in urls]):
+            if isinstance(ret, list) and len(ret) > 0:
+                result.extend(ret)
+        return result
+
+    async def get_details(self, app_id):
+        """
+        Get the information of the detail page of an application, through the details cache if any.
+
+        :param app_id: The id of the application
+        :type app_id: str
+        :return: The information found, None if the detail page cannot be fetched
+        :rtype: dict
+        """
+        if self._details_cache is not None:
+            info = self._details_cache.get(app_id)
+            self._instrumentation.cache("details", info is not None)
+            if info is not None:
+                return info
+        search_url = self._BASE + self._DETAIL + str(app_id)
+        try:
+            session = self._get_session()
+            async with self._semaphore:
+                text, status, _ = await self._fetch(session, search_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._display_error("An error occurred with the url '{}'.".format(search_url))
+            return None
+        if status != 200:
+            self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
+                                .format(search_url, status))
+            return None
+        info = await self._parse(self._parse_details, text)
+        if self._details_cache is not None:
+            self._details_cache.set(app_id, info)
+        return info
+
+    async def _transfer(self, dl_url, tmp_app, chunk_size):
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        size = 0
+        session = self._get_session()
+        async with self._semaphore:
+            start = time.perf_counter()
+            async with session.get(dl_url, timeout=self._transfer_timeout) as req:
+                self._instrumentation.request(dl_url, req.status, time.perf_counter() - start, 0, 0)
+                if req.status != 200:
+                    raise IOError("Unexpected status code {} for the url {}.".format(req.status, dl_url))
+                loop = asyncio.get_running_loop()
+
+                def write(apk, block):
+                    apk.write(block)
+                    sha256.update(block)
+                    md5.update(block)
+
+                with open(tmp_app, "wb") as apk:
+                    # The chunks are gathered into blocks of chunk_size, written and hashed out of the event loop.
+                    block = bytearray()
+                    async for chunk in req.content.iter_chunked(chunk_size):
+                        block += chunk
+                        size += len(chunk)
+                        if len(block) >= chunk_size:
+                            await loop.run_in_executor(None, write, apk, bytes(block))
+                            block.clear()
+                    if block:
+                        await loop.run_in_executor(None, write, apk, bytes(block))
+                if req.content_length is not None and size != req.content_length:
+                    raise IOError("Incomplete transfer of the url {}: {} of {} bytes."
+                                  .format(dl_url, size, req.content_length))
+        self._instrumentation.download(dl_url, size, time.perf_counter() - start)
+        return size, sha256.hexdigest(), md5.hexdigest()
+
+    async def _download_application(self, application, download_folder, tmp_folder, progress=None,
+                                    chunk_size=1 << 20, scheduler=None):
+        target = self._prepare_download(application, download_folder)
+        if target is None:
+            return None
+        app_name, package, app_folder, dl_url, apk_name = target
+        merged = self._merge_details(application, await self.get_details(application[self._APP_ID]), package,
+                                     app_folder, apk_name)
+        if merged is None:
+            return None
+        app_info, apk_name = merged
+        reserved = None
+        if scheduler is not None:
+            reserved = self._admit_download(scheduler, app_info)
+            if reserved is None:
+                return None
+        tmp_app = os.path.join(tmp_folder, apk_name)
+        size = 0
+        try:
+            size, sha256, md5 = await self._transfer(dl_url, tmp_app, chunk_size)
+        except BaseException as exception:
+            if os.path.exists(tmp_app):
+                os.remove(tmp_app)
+            if not isinstance(exception, (IOError, aiohttp.ClientError, asyncio.TimeoutError)):
+                raise
+            self._display_error("IOError exception for app \"{}\".Skip this app.".format(app_name))
+            return None
+        finally:
+            if scheduler is not None:
+                scheduler.release(reserved, size)
+        app_info = await asyncio.get_running_loop().run_in_executor(
+            None, self._complete_download, app_info, tmp_app, app_folder, apk_name, package, size, sha256, md5)
+        if progress == "quiet":
+            self._display_progress("Downloaded '{}' ({} bytes).".format(app_name, size))
+        return app_info
+
+    async def download(self, applications, workers=4, chunk_size=1 << 20, progress=None, max_bytes=None,
+                       min_free_space=0):
+        """
+        Download a list of application from a previous call to the search method.
+        The detail page lookups and the APK transfers of up to workers applications run concurrently.
+        The applications are scheduled as by MobileAssistant360.download: repeated ones are skipped, the others
+        start by increasing listed size if they fit in the free disk space and in the byte budget.
+
+        :param applications: A list of application to download from the search method call
+        :type applications: list
+        :param workers: The number of applications downloaded at the same time
+        :type workers: int
+        :param chunk_size: The size of the chunks read from the network and written to the disk
+        :type chunk_size: int
+        :param progress: "quiet" for a line per downloaded APK, None for nothing
+        :type progress: str
+        :param max_bytes: The max number of bytes downloaded by this call, None for no limit
+        :type max_bytes: int
+        :param min_free_space: The number of bytes kept free on the file system of the download folder
+        :type min_free_space: int
+        :return: A list of well downloaded applications, in the order of the given list
+        :rtype: list
+        """
+        if not isinstance(applications, list):
+            raise TypeError("Error: applications must be a list of applications")
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("Error: workers must be a positive integer")
+        if progress not in ("quiet", None):
+            raise ValueError("Error: progress must be \"quiet\" or None")
+        download_folder = self._get_download_folder()
+        scheduler = DownloadScheduler(download_folder, max_bytes, min_free_space)
+        tmp_folder = self._create_tmp_folder(download_folder)
+        jobs, repeated = scheduler.plan(applications)
+        for index in repeated:
+            self._display_warning("The app \"{}\" is repeated in the list. Skip this app."
+                                  .format(applications[index].get(self._APP_NAME)))
+        slots = asyncio.Semaphore(workers)
+
+        async def download_application(index):
+            async with slots:
+                return index, await self._download_application(applications[index], download_folder, tmp_folder,
+                                                               progress=progress, chunk_size=chunk_size,
+                                                               scheduler=scheduler)
+
+        downloaded = await asyncio.gather(*[download_application(index) for index in jobs])
+        result = [app_info for _, app_info in sorted(downloaded, key=lambda job: job[0]) if app_info is not None]
+        if self._local_index is not None:
+            self._local_index.add(result)
+        try:
+            os.rmdir(tmp_folder)
+        except OSError:
+            pass
+        return result
+
+    async def sync(self, applications, **kwargs):
+        """
+        Download only the applications which are missing from the download folder or newer than the mirrored ones,
+        as MobileAssistant360.sync.
+
+        :param applications: A list of application from the search or browse methods
+        :type applications: list
+        :param kwargs: The other arguments of the download method
+        :return: A list of well downloaded applications
+        :rtype: list
+        """
+        return await self.download(self._select_missing_or_newer(applications), **kwargs)
+
+    def crawl_catalog(self, output, workers=8, progress=None):
+        """
+        Not available on the asyncio client, whose requests are coroutines: use MobileAssistant360.crawl_catalog.
+        """
+        raise NotImplementedError("Error: crawl_catalog is only available on MobileAssistant360")
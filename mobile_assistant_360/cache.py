@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+
+def _resolve_path(path, file_name):
+    """
+    Return the path of a database file given as itself or as the folder where it is created, when it is opened
+    """
+    if os.path.isdir(path) or not os.path.basename(path):
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, file_name)
+    return path
+
+
+class DetailsCache(object):
+    """
+    A persistent cache of the application details, stored in a SQLite database and keyed by application id.
+    Entries older than ttl are fetched again and the least recently used entries are evicted beyond max_entries.
+    """
+
+    _FILE_NAME = ".mobile_assistant_360_details.sqlite"
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=100000):
+        """
+        :param path: Path of the database file, or of a folder (usually the download folder) where it is created,
+                     which is resolved when the database is opened by the first lookup. A path ending with a
+                     separator is always a folder.
+        :type path: str
+        :param ttl: The number of seconds an entry stays valid, None for no expiration
+        :type ttl: float
+        :param max_entries: The max number of stored entries, None for no limit
+        :type max_entries: int
+        """
+        if not isinstance(path, str):
+            raise TypeError("Error: path must be a string")
+        self._path = path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _get_connection(self):
+        with self._lock:
+            if self._connection is None:
+                connection = sqlite3.connect(_resolve_path(self._path, self._FILE_NAME), check_same_thread=False)
+                with connection:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("CREATE TABLE IF NOT EXISTS details (app_id TEXT PRIMARY KEY,"
+                                       " data TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS details_accessed ON details (accessed)")
+                self._connection = connection
+            return self._connection
+
+    @property
+    def hits(self):
+        """
+        The number of lookups answered by a valid entry
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        The number of lookups of a missing or expired entry
+        """
+        return self._misses
+
+    def get(self, app_id):
+        """
+        Get the cached details of an application.
+
+        :param app_id: The id of the application
+        :return: The details of the application, None if missing or expired
+        :rtype: dict
+        """
+        app_id = str(app_id)
+        now = time.time()
+        connection = self._get_connection()
+        with self._lock, connection:
+            row = connection.execute("SELECT data, created FROM details WHERE app_id = ?",
+                                     (app_id,)).fetchone()
+            if row is not None and self._ttl is not None and now - row[1] > self._ttl:
+                connection.execute("DELETE FROM details WHERE app_id = ?", (app_id,))
+                row = None
+            if row is None:
+                self._misses += 1
+                return None
+            connection.execute("UPDATE details SET accessed = ? WHERE app_id = ?", (now, app_id))
+            self._hits += 1
+        return json.loads(row[0])
+
+    def set(self, app_id, details):
+        """
+        Store the details of an application.
+
+        :param app_id: The id of the application
+        :param details: The details of the application
+        :type details: dict
+        """
+        if not isinstance(details, dict):
+            raise TypeError("Error: details must be a dict")
+        now = time.time()
+        data = json.dumps(details, ensure_ascii=False)
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.execute("INSERT OR REPLACE INTO details (app_id, data, created, accessed)"
+                               " VALUES (?, ?, ?, ?)", (str(app_id), data, now, now))
+            if self._max_entries is not None:
+                connection.execute("DELETE FROM details WHERE app_id IN (SELECT app_id FROM details"
+                                   " ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self._max_entries,))
+
+    def clear(self):
+        """
+        Remove every entry and reset the hit and miss counters.
+        """
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.execute("DELETE FROM details")
+            self._hits = 0
+            self._misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        connection = self._get_connection()
+        with self._lock:
+            return connection.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag", "last_modified", "parsed"])
+
+
+class ResponseCache(object):
+    """
+    A persistent HTTP cache of the store pages, stored in a SQLite database and keyed by url.
+    Pages are stored with their ETag/Last-Modified validators to be revalidated with conditional requests,
+    and optionally with their parsed result so that an unchanged page is not parsed again.
+    """
+
+    _FILE_NAME = ".mobile_assistant_360_responses.sqlite"
+
+    def __init__(self, path, store_parsed=True, max_entries=100000):
+        """
+        :param path: Path of the database file, or of a folder where it is created, which is resolved when the
+                     database is opened by the first lookup. A path ending with a separator is always a folder.
+        :type path: str
+        :param store_parsed: Store the parsed result next to the page body
+        :type store_parsed: bool
+        :param max_entries: The max number of stored pages, None for no limit
+        :type max_entries: int
+        """
+        if not isinstance(path, str):
+            raise TypeError("Error: path must be a string")
+        self._path = path
+        self._store_parsed = store_parsed
+        self._max_entries = max_entries
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _get_connection(self):
+        with self._lock:
+            if self._connection is None:
+                connection = sqlite3.connect(_resolve_path(self._path, self._FILE_NAME), check_same_thread=False)
+                with connection:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY,"
+                                       " body TEXT NOT NULL, etag TEXT, last_modified TEXT, parsed TEXT,"
+                                       " accessed REAL NOT NULL)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+                self._connection = connection
+            return self._connection
+
+    @property
+    def hits(self):
+        """
+        The number of pages served from the cache after a 304 response
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        The number of pages downloaded in full
+        """
+        return self._misses
+
+    def get(self, url):
+        """
+        Get the stored page of an url.
+
+        :param url: The url of the page
+        :type url: str
+        :return: The stored page, None if missing
+        :rtype: CachedResponse
+        """
+        connection = self._get_connection()
+        with self._lock:
+            row = connection.execute("SELECT body, etag, last_modified, parsed FROM responses WHERE url = ?",
+                                     (url,)).fetchone()
+        if row is None:
+            return None
+        parsed = json.loads(row[3]) if row[3] is not None else None
+        return CachedResponse(row[0], row[1], row[2], parsed)
+
+    def revalidated(self, url):
+        """
+        Record that the stored page of an url has been confirmed unchanged by the server.
+
+        :param url: The url of the page
+        :type url: str
+        """
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.execute("UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url))
+            self._hits += 1
+
+    def set(self, url, body, etag=None, last_modified=None, parsed=None):
+        """
+        Store a page. Pages without any validator cannot be revalidated and are not stored.
+
+        :param url: The url of the page
+        :type url: str
+        :param body: The body of the page
+        :type body: str
+        :param etag: The ETag header of the response
+        :type etag: str
+        :param last_modified: The Last-Modified header of the response
+        :type last_modified: str
+        :param parsed: The result of the parsing of the page, JSON serializable or made of mappings
+        """
+        connection = self._get_connection()
+        with self._lock, connection:
+            self._misses += 1
+            if etag is None and last_modified is None:
+                connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+                return
+            data = None
+            if self._store_parsed and parsed is not None:
+                data = json.dumps(parsed, ensure_ascii=False, default=dict)
+            connection.execute("INSERT OR REPLACE INTO responses (url, body, etag, last_modified, parsed,"
+                               " accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                               (url, body, etag, last_modified, data, time.time()))
+            if self._max_entries is not None:
+                connection.execute("DELETE FROM responses WHERE url IN (SELECT url FROM responses"
+                                   " ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self._max_entries,))
+
+    def set_parsed(self, url, parsed):
+        """
+        Store the parsed result of an already stored page.
+
+        :param url: The url of the page
+        :type url: str
+        :param parsed: The result of the parsing of the page, JSON serializable or made of mappings
+        """
+        if not self._store_parsed:
+            return
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.execute("UPDATE responses SET parsed = ? WHERE url = ?",
+                               (json.dumps(parsed, ensure_ascii=False, default=dict), url))
+
+    def clear(self):
+        """
+        Remove every page and reset the hit and miss counters.
+        """
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.execute("DELETE FROM responses")
+            self._hits = 0
+            self._misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        connection = self._get_connection()
+        with self._lock:
+            return connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+import json
+import re
+import sqlite3
+import threading
+
+from mobile_assistant_360.cache import _resolve_path
+from mobile_assistant_360.record import AppRecord
+
+
+class LocalIndex(object):
+    """
+    An offline index of crawled or downloaded applications, stored in a SQLite database.
+    Applications can be found by id, package and name substring, and sorted by downloads or rating.
+    Name substrings of at least 3 characters are matched with a FTS5 trigram index when SQLite supports it.
+    """
+
+    _FILE_NAME = ".mobile_assistant_360_index.sqlite"
+
+    _APP_ID = "AppId"
+    _APP_NAME = "Name"
+    _APP_PACKAGE = "PackageName"
+    _APP_DOWNLOADS = "Downloads"
+    _APP_RATING = "Rating"
+
+    _ORDERS = {None: "apps.rowid", _APP_DOWNLOADS: "apps.downloads DESC", _APP_RATING: "apps.rating DESC"}
+
+    _NUMBER = re.compile(r"(\d+(?:\.\d+)?)\s*(万|亿)?")
+    _UNITS = {None: 1, "万": 10 ** 4, "亿": 10 ** 8}
+
+    def __init__(self, path=":memory:"):
+        """
+        :param path: Path of the database file, or of a folder where it is created, in memory by default. A folder
+                     is resolved when the database is opened by the first use, and a path ending with a separator is
+                     always a folder.
+        :type path: str
+        """
+        if not isinstance(path, str):
+            raise TypeError("Error: path must be a string")
+        self._path = path
+        self._fts = False
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _get_connection(self):
+        with self._lock:
+            if self._connection is None:
+                connection = sqlite3.connect(_resolve_path(self._path, self._FILE_NAME), check_same_thread=False)
+                with connection:
+                    connection.execute("CREATE TABLE IF NOT EXISTS apps (app_id TEXT PRIMARY KEY, name TEXT,"
+                                       " package TEXT, downloads INTEGER, rating REAL, data TEXT NOT NULL)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS apps_package ON apps (package)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS apps_downloads ON apps (downloads)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS apps_rating ON apps (rating)")
+                    self._fts = self._create_fts(connection)
+                self._connection = connection
+            return self._connection
+
+    @staticmethod
+    def _create_fts(connection):
+        try:
+            connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS apps_fts USING fts5(name, content='apps',"
+                               " content_rowid='rowid', tokenize='trigram')")
+        except sqlite3.OperationalError:
+            return False
+        connection.execute("CREATE TRIGGER IF NOT EXISTS apps_insert AFTER INSERT ON apps BEGIN"
+                           " INSERT INTO apps_fts (rowid, name) VALUES (new.rowid, new.name); END")
+        connection.execute("CREATE TRIGGER IF NOT EXISTS apps_delete AFTER DELETE ON apps BEGIN"
+                           " INSERT INTO apps_fts (apps_fts, rowid, name)"
+                           " VALUES ('delete', old.rowid, old.name); END")
+        connection.execute("CREATE TRIGGER IF NOT EXISTS apps_update AFTER UPDATE ON apps BEGIN"
+                           " INSERT INTO apps_fts (apps_fts, rowid, name)"
+                           " VALUES ('delete', old.rowid, old.name);"
+                           " INSERT INTO apps_fts (rowid, name) VALUES (new.rowid, new.name); END")
+        return True
+
+    @classmethod
+    def _parse_number(cls, value):
+        """
+        Convert a number of the store such as "1.2亿次下载" or "8.5分" to a number, or None
+        """
+        if not isinstance(value, str):
+            return None
+        match = cls._NUMBER.search(value)
+        if match is None:
+            return None
+        return float(match.group(1)) * cls._UNITS[match.group(2)]
+
+    def add(self, applications):
+        """
+        Add or update applications in the index.
+
+        :param applications: Applications with an AppId, as returned by search, browse, download or crawl_catalog
+        :type applications: iterable
+        :return: The number of indexed applications
+        :rtype: int
+        """
+        rows = []
+        for application in applications:
+            app_id = application.get(self._APP_ID)
+            if app_id is None:
+                continue
+            downloads = self._parse_number(application.get(self._APP_DOWNLOADS))
+            rows.append((str(app_id), application.get(self._APP_NAME), application.get(self._APP_PACKAGE),
+                         int(downloads) if downloads is not None else None,
+                         self._parse_number(application.get(self._APP_RATING)),
+                         json.dumps(dict(application), ensure_ascii=False)))
+        connection = self._get_connection()
+        with self._lock, connection:
+            connection.executemany("INSERT INTO apps (app_id, name, package, downloads, rating, data)"
+                                   " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (app_id) DO UPDATE SET"
+                                   " name = excluded.name, package = excluded.package,"
+                                   " downloads = excluded.downloads, rating = excluded.rating,"
+                                   " data = excluded.data", rows)
+        return len(rows)
+
+    def add_jsonl(self, path):
+        """
+        Add the applications of a JSON Lines file, such as the output of crawl_catalog.
+
+        :param path: Path of the JSON Lines file
+        :type path: str
+        :return: The number of indexed applications
+        :rtype: int
+        """
+        with open(path, encoding="utf-8") as file:
+            return self.add(json.loads(line) for line in file if line.strip())
+
+    def get(self, app_id):
+        """
+        :param app_id: The id of an application
+        :return: The indexed application, None if missing
+        :rtype: AppRecord
+        """
+        connection = self._get_connection()
+        with self._lock:
+            row = connection.execute("SELECT data FROM apps WHERE app_id = ?", (str(app_id),)).fetchone()
+        return AppRecord(json.loads(row[0])) if row is not None else None
+
+    def search(self, name=None, package=None, nb_result=50, order_by=None):
+        """
+        Find indexed applications.
+
+        :param name: A substring of the application name, case insensitive
+        :type name: str
+        :param package: The exact package name
+        :type package: str
+        :param nb_result: The max number of returned applications, None for no limit
+        :type nb_result: int
+        :param order_by: None for the indexing order, "Downloads" or "Rating" for a decreasing order
+        :type order_by: str
+        :return: A list of applications
+        :rtype: list
+        """
+        if order_by not in self._ORDERS:
+            raise ValueError("Error: order_by must be None, \"Downloads\" or \"Rating\"")
+        # The connection is opened first, which tells whether the trigram index is supported.
+        connection = self._get_connection()
+        tables = "apps"
+        conditions = []
+        parameters = []
+        if name:
+            if self._fts and len(name) >= 3:
+                tables = "apps JOIN apps_fts ON apps_fts.rowid = apps.rowid"
+                conditions.append("apps_fts MATCH ?")
+                parameters.append('"' + name.replace('"', '""') + '"')
+            else:
+                conditions.append("apps.name LIKE ? ESCAPE '\\'")
+                parameters.append("%" + re.sub(r"([%_\\])", r"\\\1", name) + "%")
+        if package is not None:
+            conditions.append("apps.package = ?")
+            parameters.append(package)
+        query = "SELECT apps.data FROM " + tables
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + self._ORDERS[order_by]
+        if nb_result is not None:
+            query += " LIMIT ?"
+            parameters.append(nb_result)
+        with self._lock:
+            rows = connection.execute(query, parameters).fetchall()
+        return [AppRecord(json.loads(row[0])) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        connection = self._get_connection()
+        with self._lock:
+            return connection.execute("SELECT COUNT(*) FROM apps").fetchone()[0]
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+
+import json
+import os
+import threading
+
+from mobile_assistant_360.record import AppRecord
+
+
+class Manifest(object):
+    """
+    The metadata of a mirror in a single JSON Lines stream, where every downloaded or crawled application is
+    appended, instead of an info file per APK. The stream can be compacted into a columnar file (Parquet or Arrow
+    IPC) when pyarrow is installed, merging the records of each application, and both are read back by load.
+    """
+
+    _FILE_NAME = ".mobile_assistant_360_manifest.jsonl"
+    _FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+    _APP_ID = "AppId"
+    _APP_APK_NAME = "ApkName"
+
+    def __init__(self, path, compact_format="parquet"):
+        """
+        :param path: Path of the JSON Lines file, or of a folder where it is created, which is resolved when the
+                     file is opened, so that the download folder can be given before it is created. A path ending
+                     with a separator is always a folder.
+        :type path: str
+        :param compact_format: The format of the compacted file: "parquet" or "arrow"
+        :type compact_format: str
+        """
+        if not isinstance(path, str):
+            raise TypeError("Error: path must be a string")
+        if compact_format not in self._FORMATS:
+            raise ValueError("Error: compact_format must be \"parquet\" or \"arrow\"")
+        self._path = path
+        self._format = compact_format
+        self._lock = threading.Lock()
+        self._file = None
+
+    @property
+    def path(self):
+        if os.path.isdir(self._path) or not os.path.basename(self._path):
+            return os.path.join(self._path, self._FILE_NAME)
+        return self._path
+
+    @property
+    def compact_path(self):
+        return os.path.splitext(self.path)[0] + self._FORMATS[self._format]
+
+    def append(self, applications):
+        """
+        Append applications to the JSON Lines stream.
+
+        :param applications: Applications, as returned by search, browse, download or crawl_catalog
+        :type applications: iterable
+        :return: The number of appended applications
+        :rtype: int
+        """
+        lines = [json.dumps(dict(application), ensure_ascii=False) + "\n" for application in applications]
+        if not lines:
+            return 0
+        with self._lock:
+            if self._file is None:
+                path = self.path
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._file = open(path, "a", encoding="utf-8")
+            self._file.write("".join(lines))
+            self._file.flush()
+        return len(lines)
+
+    def _read_stream(self):
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.feather
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Error: pyarrow is required to read or write a compacted manifest") from None
+        return pyarrow
+
+    def _read_compacted(self, columns=None):
+        pyarrow = self._import_pyarrow()
+        if self._format == "parquet":
+            return pyarrow.parquet.read_table(self.compact_path, columns=columns)
+        return pyarrow.feather.read_table(self.compact_path, columns=columns)
+
+    @classmethod
+    def _deduplicate(cls, rows):
+        """
+        Merge the records of each application, identified by its AppId and ApkName, in the order of the last ones.
+        The fields of a later record replace the earlier ones, and the fields it misses, such as the size and the
+        digests of a download, are kept. The missing (None) values of the compacted columns are dropped.
+        """
+        result = {}
+        for row in rows:
+            row = {key: value for key, value in row.items() if value is not None}
+            key = (row.get(cls._APP_ID), row.get(cls._APP_APK_NAME))
+            result[key] = {**result.pop(key, {}), **row}
+        return list(result.values())
+
+    @staticmethod
+    def _to_table(pyarrow, rows):
+        columns = {}
+        for row in rows:
+            for key in row:
+                columns.setdefault(key, None)
+        return pyarrow.table({key: [row.get(key) for row in rows] for key in columns})
+
+    def load_table(self, columns=None):
+        """
+        Load the compacted file and the records appended since as a pyarrow table, without building any record.
+
+        :param columns: The names of the loaded columns, all of them if None
+        :type columns: list
+        :rtype: pyarrow.Table
+        """
+        pyarrow = self._import_pyarrow()
+        with self._lock:
+            tables = []
+            if os.path.isfile(self.compact_path):
+                tables.append(self._read_compacted(columns))
+            rows = self._read_stream()
+        if rows:
+            if columns is not None:
+                rows = [{key: row.get(key) for key in columns} for row in rows]
+            tables.append(self._to_table(pyarrow, rows))
+        if not tables:
+            return pyarrow.table({key: [] for key in columns or ()})
+        if len(tables) == 1:
+            return tables[0]
+        return pyarrow.concat_tables(tables, promote_options="permissive")
+
+    def load(self):
+        """
+        Load the applications of the compacted file and of the JSON Lines stream, merging the records of each one.
+
+        :return: A list of applications
+        :rtype: list
+        """
+        with self._lock:
+            rows = self._read_compacted().to_pylist() if os.path.isfile(self.compact_path) else []
+            rows.extend(self._read_stream())
+        return [AppRecord(row) for row in self._deduplicate(rows)]
+
+    def compact(self):
+        """
+        Merge the JSON Lines stream into the compacted file, with a single record per application, and empty
+        the stream. The compacted file is replaced atomically.
+
+        :return: The number of applications in the compacted file
+        :rtype: int
+        """
+        pyarrow = self._import_pyarrow()
+        with self._lock:
+            rows = self._read_compacted().to_pylist() if os.path.isfile(self.compact_path) else []
+            rows.extend(self._read_stream())
+            rows = self._deduplicate(rows)
+            table = self._to_table(pyarrow, rows)
+            tmp_path = self.compact_path + ".tmp"
+            if self._format == "parquet":
+                pyarrow.parquet.write_table(table, tmp_path)
+            else:
+                pyarrow.feather.write_feather(table, tmp_path)
+            os.replace(tmp_path, self.compact_path)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            open(self.path, "w").close()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,13 +1,111 @@
 #!/usr/bin/python3
 
+import importlib
+import importlib.util
 import json
 import os
-import shutil
+import queue
 import sys
-import requests
-from bs4 import BeautifulSoup
-import bs4
-from clint.textui import progress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from collections.abc import Mapping
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from urllib.parse import urlparse
+from mobile_assistant_360.metrics import Instrumentation
+from mobile_assistant_360.record import AppRecord
+from mobile_assistant_360.scheduler import DownloadScheduler
+from mobile_assistant_360.throttle import AdaptiveRateLimiter, RateLimiter, ThrottledError
+from mobile_assistant_360.transfer import ApkTransfer
+
+
+class _LazyModule(object):
+    """
+    A module imported on the first access to one of its attributes, so that importing this module or the command
+    line interface does not pay for requests and BeautifulSoup
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+requests = _LazyModule("requests")
+bs4 = _LazyModule("bs4")
+
+_DETAIL_IDS = frozenset(["app-name"])
+_DETAIL_CLASSES = frozenset(["s-1", "s-3", "base-info"])
+
+
+def _default_html_parser():
+    return "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+def _is_detail_tag(attrs):
+    """
+    Tell if a tag holds one of the fields of a detail page, from its raw attributes
+    """
+    if not attrs:
+        return False
+    if attrs.get("id") in _DETAIL_IDS:
+        return True
+    classes = attrs.get("class")
+    if isinstance(classes, str):
+        classes = classes.split()
+    return classes is not None and not _DETAIL_CLASSES.isdisjoint(classes)
+
+
+@lru_cache(maxsize=None)
+def _detail_strainer():
+    """
+    Only build the subtrees of a detail page which hold a field of the application
+    """
+    try:
+        from bs4.filter import ElementFilter
+    except ImportError:
+        return bs4.SoupStrainer(lambda name, attrs=None: _is_detail_tag(attrs))
+
+    class _DetailStrainer(ElementFilter):
+
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return _is_detail_tag(attrs)
+
+        def allow_string_creation(self, string):
+            return False
+
+    return _DetailStrainer()
+
+
+class _HostSlots(object):
+    """
+    Limit the number of concurrent requests sent to a same host
+    """
+
+    def __init__(self, per_host=None):
+        self._per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, url):
+        if self._per_host is None:
+            yield
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._per_host)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
 
 
 class MobileAssistant360(object):
@@ -32,6 +130,9 @@ class MobileAssistant360(object):
     _APP_SIZE = "Size"
     _APP_UPDATE = "LastUpdate"
     _APP_APK_NAME = "ApkName"
+    _APP_BYTES = "Bytes"
+    _APP_SHA256 = "Sha256"
+    _APP_MD5 = "Md5"
 
     _CAT_NAME = "Category"
     _CAT_ID = "CatID"
@@ -42,8 +143,262 @@ class MobileAssistant360(object):
 
     _MARKET_NAME = "MobileAssistant360"
 
-    def __init__(self, download_folder="./"):
+    _RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, download_folder="./", session=None, base_url=None, pool_size=10, timeout=(10, 60),
+                 retries=3, backoff_factor=0.5, prefetch=4, html_parser=None,
+                 details_cache=None, response_cache=None, requests_per_second=None, local_index=None,
+                 instrumentation=None, parse_workers=None, rate_limiter=None, circuit_breaker=None,
+                 throttle_retries=None, manifest=None, info_files=True):
+        """
+        :param download_folder: Path of the download folder
+        :type download_folder: str
+        :param session: A requests session used for every request, a pooled keep-alive session is created if None
+        :type session: requests.Session
+        :param base_url: The url of the store, the official store is used if None
+        :type base_url: str
+        :param pool_size: The max number of kept-alive connections per host of the created session
+        :type pool_size: int
+        :param timeout: The connect and read timeout of each request, in seconds
+        :type timeout: float or tuple
+        :param retries: The max number of retries on connection errors and throttling status codes
+        :type retries: int
+        :param backoff_factor: The backoff factor between two retries, in seconds
+        :type backoff_factor: float
+        :param prefetch: The number of result pages requested ahead by search and browse, 1 to disable
+        :type prefetch: int
+        :param html_parser: The BeautifulSoup parser backend, lxml if installed or html.parser if None
+        :type html_parser: str
+        :param details_cache: A cache of the application details used by get_details and download
+        :type details_cache: DetailsCache
+        :param response_cache: A cache revalidating the search, category and category list pages
+        :type response_cache: ResponseCache
+        :param requests_per_second: The max number of requests per second sent by all the threads, None for no limit
+        :type requests_per_second: float
+        :param local_index: An offline index fed with the downloaded and crawled applications, used by local
+                            searches
+        :type local_index: LocalIndex
+        :param instrumentation: The instrumentation notified of the requests, parses, cache lookups and APK
+                                transfers
+        :type instrumentation: Instrumentation
+        :param parse_workers: The number of processes parsing the fetched pages, None to parse them in the fetching
+                              threads. The processes are spawned, so the main module of a script must be importable.
+        :type parse_workers: int
+        :param rate_limiter: A rate limiter shared by all the requests, such as an AdaptiveRateLimiter, which
+                             replaces requests_per_second
+        :type rate_limiter: RateLimiter
+        :param circuit_breaker: A circuit breaker pausing the requests while the store keeps throttling them
+        :type circuit_breaker: CircuitBreaker
+        :param throttle_retries: The number of times a throttled or timed out request is sent again once the rate
+                                 limiter and the circuit breaker let it through. If None, it is unlimited with a
+                                 circuit breaker, which pauses the requests instead of dropping pages, 5 with an
+                                 adaptive rate limiter and 0 otherwise. With an adaptive rate limiter or a circuit
+                                 breaker, a request still throttled after its retries raises ThrottledError.
+        :type throttle_retries: int
+        :param manifest: A manifest where the downloaded and crawled applications are appended
+        :type manifest: Manifest
+        :param info_files: Whether an info file is written next to each downloaded APK
+        :type info_files: bool
+        """
         self._download_folder = download_folder
+        if base_url is not None:
+            self._BASE = base_url.rstrip("/")
+        self._timeout = timeout
+        if rate_limiter is None and requests_per_second is not None:
+            rate_limiter = RateLimiter(requests_per_second)
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
+        adaptive = isinstance(rate_limiter, AdaptiveRateLimiter) or circuit_breaker is not None
+        if throttle_retries is None and circuit_breaker is None:
+            throttle_retries = 5 if adaptive else 0
+        if throttle_retries is not None and (not isinstance(throttle_retries, int) or throttle_retries < 0):
+            raise ValueError("Error: throttle_retries must be a positive integer or None")
+        self._throttle_retries = throttle_retries
+        self._adaptive = adaptive
+        # The session is created on the first request. The throttling status codes are not retried by the session
+        # when they are reported to the limiter.
+        self._session = session
+        self._session_options = (pool_size, retries, backoff_factor, () if adaptive else self._RETRY_STATUS)
+        self._session_lock = threading.Lock()
+        if not isinstance(prefetch, int) or prefetch < 1:
+            raise ValueError("Error: prefetch must be a positive integer")
+        self._prefetch = prefetch
+        self._html_parser = html_parser if html_parser is not None else _default_html_parser()
+        self._details_cache = details_cache
+        self._response_cache = response_cache
+        self._local_index = local_index
+        self._manifest = manifest
+        self._info_files = info_files
+        self._instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        if parse_workers is not None and (not isinstance(parse_workers, int) or parse_workers < 1):
+            raise ValueError("Error: parse_workers must be a positive integer or None")
+        self._parse_workers = parse_workers
+        self._parser_pool = None
+        self._parser_pool_lock = threading.Lock()
+
+    @classmethod
+    def _create_session(cls, pool_size, retries, backoff_factor, retry_status=_RETRY_STATUS):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=retry_status,
+                      allowed_methods=frozenset(["GET"]), raise_on_status=False,
+                      respect_retry_after_header=bool(retry_status))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session(*self._session_options)
+            return self._session
+
+    def _get(self, url, **kwargs):
+        """
+        Send a GET request through the circuit breaker and the rate limiter, reporting them whether the store
+        throttled it. A throttled or timed out request is sent again up to throttle_retries times, then raises
+        ThrottledError with an adaptive rate limiter or a circuit breaker.
+        """
+        kwargs.setdefault("timeout", self._timeout)
+        attempt = 0
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.wait()
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                req = self._get_session().get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._instrumentation.request(url, None, time.perf_counter() - start, 0, attempt)
+                self._report_throttling(True)
+                if self._throttle_retries is not None and attempt >= self._throttle_retries:
+                    if self._adaptive:
+                        raise ThrottledError("The url {} failed after {} attempts.".format(url, attempt + 1))
+                    raise
+                attempt += 1
+                continue
+            except requests.exceptions.RequestException:
+                self._instrumentation.request(url, None, time.perf_counter() - start, 0, attempt)
+                raise
+            retries = getattr(req.raw, "retries", None)
+            self._instrumentation.request(url, req.status_code, time.perf_counter() - start,
+                                          0 if kwargs.get("stream") else len(req.content),
+                                          attempt + (len(retries.history) if retries is not None else 0))
+            throttled = req.status_code in self._RETRY_STATUS
+            self._report_throttling(throttled, req.headers.get("Retry-After"))
+            if not throttled:
+                return req
+            if self._throttle_retries is not None and attempt >= self._throttle_retries:
+                if not self._adaptive:
+                    return req
+                req.close()
+                raise ThrottledError("The url {} is still throttled after {} attempts (status code {})."
+                                     .format(url, attempt + 1, req.status_code))
+            req.close()
+            attempt += 1
+
+    def _report_throttling(self, throttled, retry_after=None):
+        if self._circuit_breaker is not None:
+            if throttled:
+                self._circuit_breaker.failure()
+            else:
+                self._circuit_breaker.success()
+        if self._rate_limiter is not None:
+            if not throttled:
+                self._rate_limiter.success()
+            elif retry_after is not None and retry_after.isdigit():
+                self._rate_limiter.throttled(int(retry_after))
+            else:
+                self._rate_limiter.throttled()
+
+    def _get_parser_pool(self):
+        with self._parser_pool_lock:
+            if self._parser_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._parser_pool = ProcessPoolExecutor(max_workers=self._parse_workers,
+                                                        mp_context=multiprocessing.get_context("spawn"))
+            return self._parser_pool
+
+    def _parse(self, parse, html, *args):
+        """
+        Parse a page with the classmethod parse(html, html_parser, *args), in the parser processes if any, and
+        report the parse duration.
+        """
+        start = time.perf_counter()
+        if self._parse_workers is None:
+            parsed = parse(html, self._html_parser, *args)
+        else:
+            parsed = self._get_parser_pool().submit(parse, html, self._html_parser, *args).result()
+        self._instrumentation.parse(parse.__name__[len("_parse_"):], time.perf_counter() - start)
+        return parsed
+
+    def _get_parsed_page(self, url, parse, *args):
+        """
+        Get a page and parse it with parse(html, html_parser, *args), or return None if the status code is not 200.
+        With a response cache, the stored page is revalidated and an unchanged page is not parsed again.
+        """
+        entry = self._response_cache.get(url) if self._response_cache is not None else None
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+        req = self._get(url, headers=headers)
+        if self._response_cache is not None:
+            self._instrumentation.cache("response", req.status_code == 304 and entry is not None)
+        if req.status_code == 304 and entry is not None:
+            self._response_cache.revalidated(url)
+            if entry.parsed is not None:
+                return self._restore_parsed(entry.parsed)
+            parsed = self._parse(parse, entry.body, *args)
+            if parsed is not None:
+                self._response_cache.set_parsed(url, parsed)
+            return parsed
+        if req.status_code != 200:
+            self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
+                                .format(url, req.status_code))
+            return None
+        parsed = self._parse(parse, req.text, *args)
+        if self._response_cache is not None:
+            self._response_cache.set(url, req.text, req.headers.get("ETag"), req.headers.get("Last-Modified"),
+                                     parsed)
+        return parsed
+
+    def close(self):
+        """
+        Close the connections kept alive by the HTTP session and stop the parser processes.
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+        with self._parser_pool_lock:
+            if self._parser_pool is not None:
+                self._parser_pool.shutdown()
+                self._parser_pool = None
+
+    @staticmethod
+    def _detach(value):
+        """
+        Copy a string of a BeautifulSoup tree to a plain str, so that the records do not keep the tree alive
+        """
+        return str(value) if isinstance(value, str) else value
+
+    @classmethod
+    def _restore_parsed(cls, parsed):
+        """
+        Rebuild the application records of a parsed page loaded from the response cache
+        """
+        if isinstance(parsed, list):
+            return [AppRecord(item) if isinstance(item, dict) and cls._APP_ID in item else item
+                    for item in parsed]
+        return parsed
 
     @staticmethod
     def _get_apk_package_and_version_from_url(url):
@@ -65,20 +420,15 @@ class MobileAssistant360(object):
                         package = package[:index]
         return apk_name, package, version
 
-    def _get_page_apps(self, keyword, page):
+    @classmethod
+    def _parse_search_page(cls, html, html_parser):
         result = []
-        search_url = self._BASE + self._SEARCH + keyword + "&page={}".format(page)
-        req = requests.get(search_url)
-        if req.status_code != 200:
-            self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
-                                .format(search_url, req.status_code))
-            return None
-        bsoup = BeautifulSoup(req.text, "html.parser")
+        bsoup = bs4.BeautifulSoup(html, html_parser)
         html_app_list = bsoup.find(attrs={'class': 'SeaCon'}).find_all("li")
         if html_app_list is None or len(html_app_list) <= 0:
             return result
         for html_app in html_app_list:
-            app = {}
+            app = AppRecord()
             title = html_app.find("h3").a["title"]
             nb_down = html_app.find(attrs={'class': 'downNum'})
             app_id = html_app.find(attrs={'class': 'download comdown'}).a['sid']
@@ -88,24 +438,102 @@ class MobileAssistant360(object):
                 rate = rate[2].strip()
             else:
                 rate = None
-            apk_name, package, version = self._get_apk_package_and_version_from_url(dl_link)
-            app[self._APP_NAME] = title
+            size = html_app.find(attrs={'class': 'size'})
+            apk_name, package, version = cls._get_apk_package_and_version_from_url(dl_link)
+            app[cls._APP_NAME] = title
             if apk_name is not None:
-                app[self._APP_APK_NAME] = apk_name
+                app[cls._APP_APK_NAME] = apk_name
             if package is not None:
-                app[self._APP_PACKAGE] = package
+                app[cls._APP_PACKAGE] = package
             if version is not None:
-                app[self._APP_VERSION] = version
-            app[self._APP_ID] = app_id
+                app[cls._APP_VERSION] = version
+            app[cls._APP_ID] = app_id
             if rate is not None:
-                app[self._APP_RATING] = rate
-            app[self._APP_DOWNLOADS] = nb_down.string
-            app[self._APP_LINK] = dl_link
+                app[cls._APP_RATING] = rate
+            if size is not None and isinstance(size.string, str):
+                app[cls._APP_SIZE] = size.string.strip()
+            app[cls._APP_DOWNLOADS] = cls._detach(nb_down.string)
+            app[cls._APP_LINK] = dl_link
             if isinstance(title, str) and isinstance(dl_link, str):
                 result.append(app)
         return result
 
-    def search(self, keyword, nb_result=50):
+    def _get_page_apps(self, keyword, page):
+        search_url = self._BASE + self._SEARCH + keyword + "&page={}".format(page)
+        try:
+            return self._get_parsed_page(search_url, self._parse_search_page)
+        except requests.exceptions.RequestException:
+            self._display_error("An error occurred with the url '{}'.".format(search_url))
+            return None
+
+    def _iter_pages(self, get_page, key):
+        """
+        Yield the non empty pages returned by get_page(key, page) in order, starting from the page 1.
+        Up to self._prefetch pages are requested ahead, the pending ones are cancelled when the iteration stops.
+        """
+        if self._prefetch <= 1:
+            page = 1
+            while True:
+                apps = get_page(key, page)
+                page += 1
+                if apps is None or len(apps) <= 0:
+                    return
+                yield apps
+        executor = ThreadPoolExecutor(max_workers=self._prefetch)
+        try:
+            pending = deque(executor.submit(get_page, key, page) for page in range(1, self._prefetch + 1))
+            page = self._prefetch + 1
+            while True:
+                apps = pending.popleft().result()
+                if apps is None or len(apps) <= 0:
+                    return
+                pending.append(executor.submit(get_page, key, page))
+                page += 1
+                yield apps
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_apps(self, get_page, key, nb_result):
+        if nb_result is not None and nb_result <= 0:
+            return
+        count = 0
+        with closing(self._iter_pages(get_page, key)) as pages:
+            for apps in pages:
+                if nb_result is not None:
+                    apps = apps[:nb_result - count]
+                for app in apps:
+                    count += 1
+                    yield app
+                if nb_result is not None and count >= nb_result:
+                    return
+
+    def _check_source(self, source):
+        if source not in ("remote", "local"):
+            raise ValueError("Error: source must be \"remote\" or \"local\"")
+        if source == "local" and self._local_index is None:
+            raise ValueError("Error: a local search requires a local_index")
+
+    def iter_search(self, keyword, nb_result=None, source="remote"):
+        """
+        Search applications according to a given keyword, yielding them as soon as each result page is parsed.
+
+        :param keyword: A keyword used to search applications
+        :type keyword: str
+        :param nb_result: An integer corresponding to the limit number of yielded application, None for no limit
+        :type nb_result: int
+        :param source: "remote" to search the store, "local" to search the names of the local index
+        :type source: str
+        :return: A generator of the applications found
+        :rtype: generator
+        """
+        if type(keyword) is not str:
+            raise TypeError("Error: keyword must be a string")
+        self._check_source(source)
+        if source == "local":
+            return iter(self._local_index.search(keyword, nb_result=nb_result))
+        return self._iter_apps(self._get_page_apps, keyword, nb_result)
+
+    def search(self, keyword, nb_result=50, source="remote"):
         """
         Search applications according to a given keyword.
 
@@ -113,25 +541,14 @@ class MobileAssistant360(object):
         :type keyword: str
         :param nb_result: An integer corresponding to the limit number of application in the returned list
         :type nb_result: int
+        :param source: "remote" to search the store, "local" to search the names of the local index
+        :type source: str
         :return: A list of applications found
         :rtype: list
         """
-        if type(keyword) is not str:
-            raise TypeError("Error: keyword must be a string")
-        result = []
-        loop = True
-        page = 1
-        while loop:
-            apps = self._get_page_apps(keyword, page)
-            page += 1
-            if apps is None or len(apps) <= 0 or len(apps) + len(result) >= nb_result:
-                loop = False
-            if apps is not None and len(apps) > 0:
-                result.extend(apps)
-                if len(result) > nb_result:
-                    x = len(result) - nb_result
-                    result = result[:-x]
-        return result
+        if nb_result is not None and nb_result <= 0:
+            return []
+        return list(self.iter_search(keyword, nb_result, source))
 
     def set_download_folder(self, download_folder):
         """
@@ -145,105 +562,98 @@ class MobileAssistant360(object):
         self._download_folder = download_folder
 
     @staticmethod
-    def _get_title_from_details(bsoup):
+    def _get_base_info_field(td, index):
         result = None
-        app_name = bsoup.find(attrs={"id": "app-name"})
-        if app_name is not None and app_name.span is not None and isinstance(app_name.span.get('title'), str):
-            result = app_name.span['title']
+        if len(td) > index and isinstance(td[index], bs4.element.Tag):
+            if isinstance(td[index].contents, list) and len(td[index].contents) > 1:
+                if isinstance(td[index].contents[1], str):
+                    result = str(td[index].contents[1])
         return result
 
-    @staticmethod
-    def _get_rating_from_details(bsoup):
-        result = None
-        s_1 = bsoup.find(attrs={"class": "s-1"})
+    @classmethod
+    def _get_details_from_soup(cls, bsoup):
+        result = {}
+        app_name = None
+        s_1 = None
+        base_info = None
+        s_3 = []
+        for tag in bsoup.find_all(True):
+            if app_name is None and tag.get("id") == "app-name":
+                app_name = tag
+            classes = tag.get("class")
+            if classes:
+                if s_1 is None and "s-1" in classes:
+                    s_1 = tag
+                if base_info is None and "base-info" in classes:
+                    base_info = tag
+                if "s-3" in classes:
+                    s_3.append(tag)
+        if app_name is not None and app_name.span is not None and isinstance(app_name.span.get('title'), str):
+            result[cls._APP_NAME] = str(app_name.span['title'])
         if s_1 is not None and len(s_1.contents) > 0 and isinstance(s_1.contents[0], str):
-            result = s_1.contents[0]
+            result[cls._APP_RATING] = str(s_1.contents[0])
+        tbody = base_info.find("tbody") if base_info is not None else None
+        if tbody is not None:
+            td = tbody.find_all("td")
+            for index, key in enumerate((cls._APP_CREATOR, cls._APP_UPDATE, cls._APP_VERSION)):
+                value = cls._get_base_info_field(td, index)
+                if value is not None:
+                    result[key] = value
+        if len(s_3) > 1 and isinstance(s_3[1].string, str):
+            result[cls._APP_SIZE] = str(s_3[1].string)
         return result
 
-    @staticmethod
-    def _get_creator_from_details(bsoup):
-        result = None
-        base_info = bsoup.find(attrs={"class": "base-info"})
-        if base_info is not None:
-            tbody = base_info.find("tbody")
-            if tbody is not None:
-                td = tbody.findAll("td")
-                if td is not None and isinstance(td, list) and len(td) > 0 and isinstance(td[0], bs4.element.Tag):
-                    if isinstance(td[0].contents, list) and len(td[0].contents) > 1:
-                        if isinstance(td[0].contents[1], str):
-                            result = td[0].contents[1]
-        return result
-
-    @staticmethod
-    def _get_update_from_details(bsoup):
-        result = None
-        base_info = bsoup.find(attrs={"class": "base-info"})
-        if base_info is not None:
-            tbody = base_info.find("tbody")
-            if tbody is not None:
-                td = tbody.findAll("td")
-                if td is not None and isinstance(td, list) and len(td) > 1 and isinstance(td[1], bs4.element.Tag):
-                    if isinstance(td[1].contents, list) and len(td[1].contents) > 1:
-                        if isinstance(td[1].contents[1], str):
-                            result = td[1].contents[1]
-        return result
-
-    @staticmethod
-    def _get_version_from_details(bsoup):
-        result = None
-        base_info = bsoup.find(attrs={"class": "base-info"})
-        if base_info is not None:
-            tbody = base_info.find("tbody")
-            if tbody is not None:
-                td = tbody.findAll("td")
-                if td is not None and isinstance(td, list) and len(td) > 2 and isinstance(td[2], bs4.element.Tag):
-                    if isinstance(td[2].contents, list) and len(td[2].contents) > 1:
-                        if isinstance(td[2].contents[1], str):
-                            result = td[2].contents[1]
-        return result
-
-    @staticmethod
-    def _get_size_from_details(bsoup):
-        result = None
-        s_3 = bsoup.findAll(attrs={"class": "s-3"})
-        if s_3 is not None and len(s_3) > 1 and isinstance(s_3[1].string, str):
-            result = s_3[1].string
-        return result
+    @classmethod
+    def _parse_details(cls, html, html_parser):
+        bsoup = bs4.BeautifulSoup(html, html_parser, parse_only=_detail_strainer())
+        return cls._get_details_from_soup(bsoup)
 
     def _get_additional_info(self, app_id):
-        result = {}
         search_url = self._BASE + self._DETAIL + str(app_id)
-        req = requests.get(search_url)
+        try:
+            req = self._get(search_url)
+        except requests.exceptions.RequestException:
+            self._display_error("An error occurred with the url '{}'.".format(search_url))
+            return None
         if req.status_code != 200:
             self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
                                 .format(search_url, req.status_code))
             return None
-        bsoup = BeautifulSoup(req.text, "html.parser")
-        title = self._get_title_from_details(bsoup)
-        rating = self._get_rating_from_details(bsoup)
-        author = self._get_creator_from_details(bsoup)
-        last_update = self._get_update_from_details(bsoup)
-        version = self._get_version_from_details(bsoup)
-        size = self._get_size_from_details(bsoup)
-        if title is not None:
-            result[self._APP_NAME] = title
-        if rating is not None:
-            result[self._APP_RATING] = rating
-        if author is not None:
-            result[self._APP_CREATOR] = author
-        if last_update is not None:
-            result[self._APP_UPDATE] = last_update
-        if version is not None:
-            result[self._APP_VERSION] = version
-        if size is not None:
-            result[self._APP_SIZE] = size
-        return result
+        return self._parse(self._parse_details, req.text)
+
+    def get_details(self, app_id):
+        """
+        Get the information of the detail page of an application, through the details cache if any.
+
+        :param app_id: The id of the application
+        :type app_id: str
+        :return: The information found, None if the detail page cannot be fetched
+        :rtype: dict
+        """
+        return self._get_details(app_id, _HostSlots())
+
+    def _get_details(self, app_id, host_slots):
+        if self._details_cache is not None:
+            info = self._details_cache.get(app_id)
+            self._instrumentation.cache("details", info is not None)
+            if info is not None:
+                return info
+        with host_slots.acquire(self._BASE + self._DETAIL):
+            info = self._get_additional_info(app_id)
+        if isinstance(info, dict) and self._details_cache is not None:
+            self._details_cache.set(app_id, info)
+        return info
 
     @staticmethod
     def _display_warning(message):
         print("Warning: {}".format(message), file=sys.stderr)
         sys.stderr.flush()
 
+    @staticmethod
+    def _display_progress(message):
+        print(message, file=sys.stderr)
+        sys.stderr.flush()
+
     @staticmethod
     def _display_error(message):
         print("Error: {}".format(message), file=sys.stderr)
@@ -276,7 +686,7 @@ class MobileAssistant360(object):
         if os.path.exists(app_folder) and not os.path.isdir(app_folder):
             return None
         elif not os.path.isdir(app_folder):
-            os.makedirs(app_folder, 0o755)
+            os.makedirs(app_folder, 0o755, exist_ok=True)
         return app_folder
 
     @staticmethod
@@ -295,90 +705,284 @@ class MobileAssistant360(object):
         if not isinstance(apk_name, str):
             self._display_error("Cannot create info file.")
             return
-        info_file = self._MARKET_NAME + "_" + apk_name[:-4] + ".info"
-        with open(os.path.join(app_folder, info_file), "w+") as file:
-            to_write = json.dumps(app_info, ensure_ascii=False, indent=4)
+        info_file = os.path.join(app_folder, self._MARKET_NAME + "_" + apk_name[:-4] + ".info")
+        # Written aside then renamed, so that a crash never leaves a truncated info file.
+        with open(info_file + ".tmp", "w") as file:
+            to_write = json.dumps(dict(app_info), ensure_ascii=False, indent=4)
             file.write(to_write)
             file.flush()
+            os.fsync(file.fileno())
+        os.replace(info_file + ".tmp", info_file)
+
+    def _apk_exists(self, app_name, app_folder, apk_name):
+        if os.path.isfile(os.path.join(app_folder, apk_name)):
+            self._display_warning("The app \"{}\" exists at \"{}\". Skip this app."
+                                  .format(app_name, os.path.join(app_folder, apk_name)))
+            return True
+        return False
+
+    def _prepare_download(self, application, download_folder):
+        """
+        Return the name, package, folder, download url and APK name (None if unknown before getting the details)
+        of an application to download, or None to skip it
+        """
+        app_name = application.get(self._APP_NAME)
+        if isinstance(application, Mapping) and self._APP_ID in application and isinstance(app_name, str):
+            package = self._get_package(application.get(self._APP_PACKAGE))
+            app_folder = self._create_app_folder(download_folder, package)
+            if app_folder is None:
+                self._display_error("Unable to create app folder for app \"{}\".\nSkip this app."
+                                    .format(app_name))
+                return None
+            dl_url = application.get(self._APP_LINK)
+            if dl_url is None:
+                self._display_error("Unable to find a download url for app \"{}\".\nSkip this app."
+                                    .format(app_name))
+                return None
+            apk_name = application.get(self._APP_APK_NAME)
+            if not isinstance(apk_name, str):
+                apk_name = self._get_apk_from_url(dl_url)
+            if isinstance(apk_name, str) and self._apk_exists(app_name, app_folder, apk_name):
+                return None
+            return app_name, package, app_folder, dl_url, apk_name
+        return None
 
-    def download(self, applications):
+    def _merge_details(self, application, info, package, app_folder, apk_name):
+        """
+        Return a copy of the application record merged with its details, and its APK name, or None to skip it.
+        The given application is left unchanged, so that the list given to download or sync can be used again.
+        """
+        app_name = application[self._APP_NAME]
+        app_info = AppRecord(application)
+        if not isinstance(info, dict):
+            self._display_warning("Unable to collect information for app \"{}\".".format(app_name))
+        else:
+            app_info.update(info)
+        if not isinstance(apk_name, str):
+            version = app_info.get(self._APP_VERSION)
+            version = "" if not isinstance(version, str) else version
+            apk_name = package + version + ".apk"
+            if self._apk_exists(app_name, app_folder, apk_name):
+                return None
+        return app_info, apk_name
+
+    def _complete_download(self, app_info, tmp_app, app_folder, apk_name, package, size, sha256, md5):
+        # The tmp folder is in the download folder, so the APK is placed by an atomic rename on the same file
+        # system.
+        with open(tmp_app, "ab") as apk:
+            os.fsync(apk.fileno())
+        os.replace(tmp_app, os.path.join(app_folder, apk_name))
+        app_info.update({self._APP_APK_NAME: apk_name, self._APP_PACKAGE: package,
+                         self._APP_BYTES: size, self._APP_SHA256: sha256, self._APP_MD5: md5})
+        if self._info_files:
+            self._create_info_file(app_folder, app_info)
+        # Appended as soon as the APK is placed, so that a crash of a long batch keeps the metadata of its APKs.
+        if self._manifest is not None:
+            self._manifest.append([app_info])
+        return app_info
+
+    def _admit_download(self, scheduler, app_info):
+        """
+        Return the number of bytes reserved by the scheduler for an application to download, or None to skip it
+        """
+        reserved = scheduler.admit(scheduler.expected_size(app_info))
+        if reserved is None:
+            self._display_warning("Not enough disk space or byte budget left for app \"{}\". Skip this app."
+                                  .format(app_info[self._APP_NAME]))
+        return reserved
+
+    def _download_application(self, application, download_folder, tmp_folder, progress="bar", segments=1,
+                              chunk_size=1 << 20, scheduler=None, host_slots=None):
+        if host_slots is None:
+            host_slots = _HostSlots()
+        target = self._prepare_download(application, download_folder)
+        if target is None:
+            return None
+        app_name, package, app_folder, dl_url, apk_name = target
+        try:
+            info = self._get_details(application[self._APP_ID], host_slots)
+        except ThrottledError as exception:
+            self._display_error("The details of app \"{}\" are throttled. {}\nSkip this app."
+                                .format(app_name, exception))
+            return None
+        merged = self._merge_details(application, info, package, app_folder, apk_name)
+        if merged is None:
+            return None
+        app_info, apk_name = merged
+        reserved = None
+        if scheduler is not None:
+            reserved = self._admit_download(scheduler, app_info)
+            if reserved is None:
+                return None
+        tmp_app = os.path.join(tmp_folder, apk_name)
+        transfer = ApkTransfer(self._get, dl_url, tmp_app, chunk_size=chunk_size, segments=segments,
+                               slot=lambda: host_slots.acquire(dl_url))
+        start = time.perf_counter()
+        try:
+            transfer.run(label="Downloading '{}': ".format(app_name) if progress == "bar" else None)
+        except IOError:
+            if os.path.isfile(tmp_app):
+                self._display_error("IOError exception for app \"{}\". The partial file \"{}\" is kept to resume"
+                                    " the download. Skip this app.".format(app_name, tmp_app))
+            else:
+                self._display_error("IOError exception for app \"{}\". Skip this app.".format(app_name))
+            return None
+        finally:
+            if scheduler is not None:
+                scheduler.release(reserved, transfer.size or 0)
+        if not os.path.isfile(tmp_app):
+            return None
+        self._instrumentation.download(dl_url, transfer.size, time.perf_counter() - start)
+        app_info = self._complete_download(app_info, tmp_app, app_folder, apk_name, package, transfer.size,
+                                           transfer.sha256, transfer.md5)
+        if progress == "quiet":
+            self._display_progress("Downloaded '{}' ({} bytes).".format(app_name, transfer.size))
+        return app_info
+
+    def download(self, applications, workers=1, per_host=None, segments=1, chunk_size=1 << 20, progress="bar",
+                 max_bytes=None, min_free_space=0):
         """
         Download a list of application from a previous call to the search method.
 
+        When workers is greater than 1, the applications are downloaded in parallel: the detail page lookups
+        of the pending applications overlap with the APK transfers of the running ones. The progress bar is
+        only displayed for sequential downloads.
+        A failed APK transfer is kept in the tmp folder and resumed by the next download of the same url.
+        The size and the SHA-256 and MD5 digests of each APK are computed while streaming and written in its info
+        file.
+        The applications repeated with the same package and version or the same url are only downloaded once, the
+        others are downloaded by increasing listed size, those without one last, and each APK is only started if
+        the size of its detail page fits in the free disk space and in the byte budget, 64 MiB being reserved for
+        an APK of unknown size. Finished APKs and info files are placed by atomic renames.
+
         :param applications: A list of application to download from the search method call
         :type applications: list
-        :return: A list of well downloaded applications
+        :param workers: The number of applications downloaded at the same time
+        :type workers: int
+        :param per_host: The max number of concurrent requests sent to the same host, None for no limit
+        :type per_host: int
+        :param segments: The number of byte-range segments downloaded in parallel for large APKs
+        :type segments: int
+        :param chunk_size: The size of the chunks read from the network and written to the disk
+        :type chunk_size: int
+        :param progress: "bar" for a progress bar per APK, "quiet" for a line per downloaded APK, None for nothing
+        :type progress: str
+        :param max_bytes: The max number of bytes downloaded by this call, None for no limit
+        :type max_bytes: int
+        :param min_free_space: The number of bytes kept free on the file system of the download folder
+        :type min_free_space: int
+        :return: A list of well downloaded applications, in the order of the given list
         :rtype: list
         """
         if not isinstance(applications, list):
             raise TypeError("Error: applications must be a list of applications")
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("Error: workers must be a positive integer")
+        if per_host is not None and (not isinstance(per_host, int) or per_host < 1):
+            raise ValueError("Error: per_host must be a positive integer or None")
+        if not isinstance(segments, int) or segments < 1:
+            raise ValueError("Error: segments must be a positive integer")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("Error: chunk_size must be a positive integer")
+        if progress not in ("bar", "quiet", None):
+            raise ValueError("Error: progress must be \"bar\", \"quiet\" or None")
+        if progress == "bar" and workers > 1:
+            progress = None
         download_folder = self._get_download_folder()
+        scheduler = DownloadScheduler(download_folder, max_bytes, min_free_space)
         tmp_folder = self._create_tmp_folder(download_folder)
-        result = []
-        for application in applications:
-            app_name = application.get(self._APP_NAME)
-            info = None
-            if isinstance(application, dict) and self._APP_ID in application and isinstance(app_name, str):
-                package = self._get_package(application.get(self._APP_PACKAGE))
-                app_folder = self._create_app_folder(download_folder, package)
-                if app_folder is None:
-                    self._display_error("Unable to create app folder for app \"{}\".\nSkip this app."
-                                          .format(app_name))
-                    continue
-                dl_url = application.get(self._APP_LINK)
-                if dl_url is None:
-                    self._display_error("Unable to find a download url for app \"{}\".\nSkip this app."
-                                          .format(app_name))
-                    continue
-                app_info = {}
-                info = self._get_additional_info(application[self._APP_ID])
-                if not isinstance(info, dict):
-                    self._display_warning("Unable to collect information for app \"{}\".".format(app_name))
-                    app_info = application
-                else:
-                    app_info = {**application, **info}
-                version = app_info.get(self._APP_VERSION)
-                apk_name = application.get(self._APP_APK_NAME)
-                if not isinstance(apk_name, str):
-                    apk_name = self._get_apk_from_url(dl_url)
-                    if not isinstance(apk_name, str):
-                        version = "" if not isinstance(version, str) else version
-                        apk_name = package + version + ".apk"
-                if os.path.isfile(os.path.join(app_folder, apk_name)):
-                    self._display_warning("The app \"{}\" exists at \"{}\". Skip this app."
-                                          .format(app_name, os.path.join(app_folder, apk_name)))
-                    continue
-                tmp_app = os.path.join(tmp_folder, apk_name)
-                try:
-                    req = requests.get(dl_url, stream=True)
-                    with open(tmp_app, "wb+") as apk:
-                        apk_len = int(req.headers.get('content-length'))
-                        chunk_size = 32 * (1 << 10)
-                        for chunk in progress.bar(req.iter_content(chunk_size=chunk_size),
-                                                  label="Downloading '{}': ".format(app_name),
-                                                  expected_size=((apk_len/chunk_size) + 1)):
-                            if chunk:
-                                apk.write(chunk)
-                                apk.flush()
-                except IOError:
-                    self._display_error("IOError exception for app \"{}\".Skip this app.".format(app_name))
-                    if os.path.exists(tmp_app):
-                        try:
-                            os.remove(tmp_app)
-                        except OSError:
-                            self._display_error("Unable to remove temporary file {}.".format(tmp_app))
-                    continue
-                if os.path.isfile(tmp_app):
-                    shutil.move(tmp_app, app_folder)
-                    app_info = {**app_info, **{self._APP_APK_NAME: apk_name, self._APP_PACKAGE: package}}
-                    result.append(app_info)
-                    self._create_info_file(app_folder, app_info)
+        jobs, repeated = scheduler.plan(applications)
+        for index in repeated:
+            self._display_warning("The app \"{}\" is repeated in the list. Skip this app."
+                                  .format(applications[index].get(self._APP_NAME)))
+        host_slots = _HostSlots(per_host)
+
+        def download_job(index):
+            return index, self._download_application(applications[index], download_folder, tmp_folder,
+                                                     progress=progress, segments=segments, chunk_size=chunk_size,
+                                                     scheduler=scheduler, host_slots=host_slots)
+
+        if workers == 1:
+            downloaded = [download_job(index) for index in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                downloaded = list(executor.map(download_job, jobs))
+        result = [app_info for _, app_info in sorted(downloaded, key=lambda job: job[0]) if app_info is not None]
+        if self._local_index is not None:
+            self._local_index.add(result)
         try:
             os.rmdir(tmp_folder)
         except OSError:
             pass
         return result
 
+    def _add_to_mirror_index(self, mirror_index, package, apk_name):
+        apk_names, last_version = mirror_index.get(package, (set(), None))
+        apk_name, _, version = self._get_apk_package_and_version_from_url(apk_name)
+        apk_names.add(apk_name)
+        if version is not None and (last_version is None or int(version) > last_version):
+            last_version = int(version)
+        mirror_index[package] = (apk_names, last_version)
+
+    def _get_mirror_index(self, download_folder):
+        """
+        Map each package folder of the download folder to the APK names and the highest version code of its info
+        files, which are read from the info file names only, and of the applications downloaded in the manifest.
+        """
+        result = {}
+        prefix = self._MARKET_NAME + "_"
+        with os.scandir(download_folder) as entries:
+            for entry in entries:
+                if entry.name == self._TMP_FOLDER or not entry.is_dir():
+                    continue
+                for name in os.listdir(entry.path):
+                    if name.startswith(prefix) and name.endswith(".info"):
+                        self._add_to_mirror_index(result, entry.name, name[len(prefix):-5] + ".apk")
+        if self._manifest is not None:
+            for application in self._manifest.load():
+                apk_name = application.get(self._APP_APK_NAME)
+                if self._APP_BYTES in application and isinstance(apk_name, str):
+                    package = self._get_package(application.get(self._APP_PACKAGE))
+                    self._add_to_mirror_index(result, package, apk_name)
+        return result
+
+    def _is_missing_or_newer(self, application, mirror_index):
+        local = mirror_index.get(self._get_package(application.get(self._APP_PACKAGE)))
+        if local is None:
+            return True
+        apk_names, last_version = local
+        apk_name = application.get(self._APP_APK_NAME)
+        if not isinstance(apk_name, str) and isinstance(application.get(self._APP_LINK), str):
+            apk_name = self._get_apk_from_url(application[self._APP_LINK])
+        if apk_name in apk_names:
+            return False
+        version = application.get(self._APP_VERSION)
+        if isinstance(version, str) and version.isdigit() and last_version is not None:
+            return int(version) > last_version
+        return True
+
+    def sync(self, applications, **kwargs):
+        """
+        Download only the applications which are missing from the download folder or newer than the mirrored ones.
+        The versions are compared with the local info files and manifest before any request, so an up to date
+        application costs no network access.
+
+        :param applications: A list of application from the search or browse methods
+        :type applications: list
+        :param kwargs: The other arguments of the download method
+        :return: A list of well downloaded applications
+        :rtype: list
+        """
+        return self.download(self._select_missing_or_newer(applications), **kwargs)
+
+    def _select_missing_or_newer(self, applications):
+        if not isinstance(applications, list):
+            raise TypeError("Error: applications must be a list of applications")
+        download_folder = self._get_download_folder()
+        mirror_index = self._get_mirror_index(download_folder) if os.path.isdir(download_folder) else {}
+        return [application for application in applications if not isinstance(application, Mapping)
+                or self._is_missing_or_newer(application, mirror_index)]
+
     @staticmethod
     def _category_href_to_id(href):
         result = ""
@@ -393,37 +997,36 @@ class MobileAssistant360(object):
                 result = href_split[0]
         return result
 
-    def _get_categories_from_url(self, url):
+    @classmethod
+    def _parse_categories(cls, html, html_parser, url):
         result = []
         try:
-            req = requests.get(url)
-            if req.status_code != 200:
-                self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
-                                    .format(url, req.status_code))
-                return None
-        except requests.exceptions.RequestException:
-            self._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
-            return None
-        try:
-            bsoup = BeautifulSoup(req.text, "html.parser")
+            bsoup = bs4.BeautifulSoup(html, html_parser)
             category_list = bsoup.find(attrs={'class': 'select'}).li.findAll("a")
             if not isinstance(category_list, list) or len(category_list) <= 1:
-                self._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
+                cls._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
                 return None
             category_list = category_list[1:]
             for category in category_list:
                 if category.string is not None and category.get('href') is not None:
-                    category_name = category.string
-                    category_id = self._category_href_to_id(category['href'])
-                    result.append({self._CAT_NAME: category_name,
-                                   self._CAT_ID: category_id})
+                    category_name = cls._detach(category.string)
+                    category_id = cls._category_href_to_id(category['href'])
+                    result.append({cls._CAT_NAME: category_name,
+                                   cls._CAT_ID: category_id})
                 else:
-                    self._display_warning("Something went wrong with the url '{}'.".format(url))
+                    cls._display_warning("Something went wrong with the url '{}'.".format(url))
         except AttributeError:
-            self._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
+            cls._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
             return None
         return result
 
+    def _get_categories_from_url(self, url):
+        try:
+            return self._get_parsed_page(url, self._parse_categories, url)
+        except requests.exceptions.RequestException:
+            self._display_error("An error occurred with the url '{}' while getting the categories.".format(url))
+            return None
+
     def list_categories(self):
         """
         List the existing categories.
@@ -447,47 +1050,57 @@ class MobileAssistant360(object):
                     return value[4:]
         return None
 
-    def _get_category_page_apps(self, category, page):
+    @classmethod
+    def _parse_category_page(cls, html, html_parser, page):
         result = []
-        category_url = self._BASE + self._CATEGORY + category + "?page={}".format(page)
         try:
-            req = requests.get(category_url)
-            if req.status_code != 200:
-                self._display_error("An error occurred with the url \"{}\".\nStatus code: {}."
-                                    .format(category_url, req.status_code))
-                return None
-        except requests.exceptions.RequestException:
-            self._display_error("An error occurred with the url '{}'.".format(category_url))
-            return None
-        try:
-            bsoup = BeautifulSoup(req.text, "html.parser")
+            bsoup = bs4.BeautifulSoup(html, html_parser)
             html_app_list = bsoup.find(attrs={'id': 'iconList'}).find_all("li")
             if html_app_list is None or len(html_app_list) <= 0:
                 return result
             for html_app in html_app_list:
-                app = {}
-                title = html_app.h3.a.string
+                app = AppRecord()
+                title = cls._detach(html_app.h3.a.string)
                 app_id = html_app.h3.a['sid']
-                nb_down = html_app.span.string
-                dl_link = self._get_app_link_from_html(html_app)
+                nb_down = cls._detach(html_app.span.string)
+                dl_link = cls._get_app_link_from_html(html_app)
                 if dl_link is not None:
-                    apk_name, package, version = self._get_apk_package_and_version_from_url(dl_link)
-                    app[self._APP_LINK] = dl_link
+                    apk_name, package, version = cls._get_apk_package_and_version_from_url(dl_link)
+                    app[cls._APP_LINK] = dl_link
                     if apk_name is not None:
-                        app[self._APP_APK_NAME] = apk_name
+                        app[cls._APP_APK_NAME] = apk_name
                     if package is not None:
-                        app[self._APP_PACKAGE] = package
+                        app[cls._APP_PACKAGE] = package
                     if version is not None:
-                        app[self._APP_VERSION] = version
-                app[self._APP_NAME] = title
-                app[self._APP_ID] = app_id
-                app[self._APP_DOWNLOADS] = nb_down
+                        app[cls._APP_VERSION] = version
+                app[cls._APP_NAME] = title
+                app[cls._APP_ID] = app_id
+                app[cls._APP_DOWNLOADS] = nb_down
                 if isinstance(title, str) and isinstance(dl_link, str):
                     result.append(app)
         except AttributeError:
-            self._display_error("An error occurred with the category page number {}.".format(page))
+            cls._display_error("An error occurred with the category page number {}.".format(page))
         return result
 
+    def _get_category_page_apps(self, category, page):
+        category_url = self._BASE + self._CATEGORY + category + "?page={}".format(page)
+        try:
+            return self._get_parsed_page(category_url, self._parse_category_page, page)
+        except requests.exceptions.RequestException:
+            self._display_error("An error occurred with the url '{}'.".format(category_url))
+            return None
+
+    def iter_browse(self, category, nb_result=None):
+        """
+        Browse a category, yielding the applications as soon as each category page is parsed.
+        :param category: The ID of the category
+        :param nb_result: The max number of yielded application
+        :return: A generator of application
+        """
+        if not isinstance(category, str):
+            raise TypeError("Error: category must be a string corresponding to a catID.")
+        return self._iter_apps(self._get_category_page_apps, category, nb_result)
+
     def browse(self, category, nb_result=None):
         """
         Browse a category
@@ -495,21 +1108,109 @@ class MobileAssistant360(object):
         :param nb_result: The max number of result
         :return: A list of application
         """
-        if not isinstance(category, str):
-            raise TypeError("Error: category must be a string corresponding to a catID.")
-        result = []
-        loop = True
-        page = 1
-        while loop:
-            apps = self._get_category_page_apps(category, page)
-            page += 1
-            if apps is None or len(apps) <= 0:
-                loop = False
-            if nb_result is not None and len(apps) + len(result) >= nb_result:
-                loop = False
-            if apps is not None and len(apps) > 0:
-                result.extend(apps)
-                if nb_result is not None and len(result) > nb_result:
-                    x = len(result) - nb_result
-                    result = result[:-x]
-        return result
+        return list(self.iter_browse(category, nb_result))
+
+    def crawl_catalog(self, output, workers=8, progress=None):
+        """
+        Crawl every page of every category of the store and write each application once, as JSON Lines.
+        The pages of all categories are fetched by workers threads from a shared work queue, each category keeping
+        up to prefetch pages in flight, and the requests are limited by requests_per_second if set.
+        Applications found in several categories are written once, with the CatID of the first one, and added to the
+        local index and the manifest if any.
+
+        :param output: Path of the JSON Lines file, or a text file object
+        :type output: str
+        :param workers: The number of threads fetching pages
+        :type workers: int
+        :param progress: "quiet" for a line per crawled category, None for nothing
+        :type progress: str
+        :return: The crawled categories by CatID, with their name and their number of pages and written applications
+        :rtype: dict
+        :raise Exception: The first error raised while crawling a page, once the workers have stopped; the
+        applications written before are kept
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("Error: workers must be a positive integer")
+        if progress not in ("quiet", None):
+            raise ValueError("Error: progress must be \"quiet\" or None")
+        stats = {}
+        for category in self.list_categories():
+            stats.setdefault(category[self._CAT_ID],
+                             {self._CAT_NAME: category[self._CAT_NAME], "Pages": 0, "Apps": 0})
+        file = open(output, "w", encoding="utf-8") if isinstance(output, str) else output
+        lock = threading.Lock()
+        tasks = queue.Queue()
+        seen = set()
+        last_pages = {}
+        pending = {}
+        errors = []
+
+        def put(cat_id, page):
+            pending[cat_id] = pending.get(cat_id, 0) + 1
+            tasks.put((cat_id, page))
+
+        def crawl_page(cat_id, page):
+            if errors or cat_id in last_pages and page > last_pages[cat_id]:
+                return
+            apps = self._get_category_page_apps(cat_id, page)
+            with lock:
+                if apps is None or len(apps) <= 0:
+                    last_pages[cat_id] = min(last_pages.get(cat_id, page), page)
+                    return
+                if cat_id in last_pages and page > last_pages[cat_id]:
+                    return
+                stats[cat_id]["Pages"] += 1
+                new_apps = []
+                for app in apps:
+                    if app[self._APP_ID] not in seen:
+                        seen.add(app[self._APP_ID])
+                        new_apps.append({**app, self._CAT_ID: cat_id})
+                        file.write(json.dumps(new_apps[-1], ensure_ascii=False) + "\n")
+                        stats[cat_id]["Apps"] += 1
+                file.flush()
+                if self._local_index is not None:
+                    self._local_index.add(new_apps)
+                if self._manifest is not None:
+                    self._manifest.append(new_apps)
+                put(cat_id, page + self._prefetch)
+
+        def work():
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                cat_id, page = task
+                try:
+                    crawl_page(cat_id, page)
+                except Exception as exception:
+                    # The remaining tasks are drained without requests, and the error is raised by crawl_catalog.
+                    with lock:
+                        errors.append(exception)
+                finally:
+                    with lock:
+                        pending[cat_id] -= 1
+                        if pending[cat_id] == 0 and progress == "quiet" and not errors:
+                            self._display_progress("Crawled category '{}': {} pages, {} new apps."
+                                                   .format(stats[cat_id][self._CAT_NAME], stats[cat_id]["Pages"],
+                                                           stats[cat_id]["Apps"]))
+                    tasks.task_done()
+
+        with lock:
+            for cat_id in stats:
+                for page in range(1, self._prefetch + 1):
+                    put(cat_id, page)
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            tasks.join()
+        finally:
+            for _ in threads:
+                tasks.put(None)
+            for thread in threads:
+                thread.join()
+            if isinstance(output, str):
+                file.close()
+        if errors:
+            raise errors[0]
+        return stats
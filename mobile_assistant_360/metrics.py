@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+import threading
+from collections import defaultdict
+
+
+class Instrumentation(object):
+    """
+    The instrumentation interface of MobileAssistant360, called on every request, parse, cache lookup and APK
+    transfer. This default implementation does nothing, subclasses override the events they need.
+    The methods may be called from several threads at the same time.
+    """
+
+    def request(self, url, status, seconds, size, retries):
+        """
+        Called after each page or APK request.
+
+        :param url: The requested url
+        :type url: str
+        :param status: The status code of the response, None if the request failed
+        :type status: int
+        :param seconds: The time until the response, including its body unless it is streamed
+        :type seconds: float
+        :param size: The size of the response body in bytes, 0 for a streamed or failed response
+        :type size: int
+        :param retries: The number of retries before the response
+        :type retries: int
+        """
+
+    def parse(self, page, seconds):
+        """
+        Called after each parsed page.
+
+        :param page: The type of page: "search_page", "category_page", "categories" or "details"
+        :type page: str
+        :param seconds: The parse duration
+        :type seconds: float
+        """
+
+    def cache(self, name, hit):
+        """
+        Called after each cache lookup.
+
+        :param name: The cache: "details" or "response"
+        :type name: str
+        :param hit: True if the cached value is used
+        :type hit: bool
+        """
+
+    def download(self, url, size, seconds):
+        """
+        Called after each completed APK transfer.
+
+        :param url: The url of the APK
+        :type url: str
+        :param size: The size of the APK in bytes
+        :type size: int
+        :param seconds: The duration of the transfer
+        :type seconds: float
+        """
+
+
+class CallbackInstrumentation(Instrumentation):
+    """
+    An instrumentation calling callback(event, fields) on every event, with the name of the Instrumentation method
+    as event and its arguments as a dict of fields.
+    """
+
+    def __init__(self, callback):
+        """
+        :param callback: The function called on every event
+        :type callback: callable
+        """
+        if not callable(callback):
+            raise TypeError("Error: callback must be callable")
+        self._callback = callback
+
+    def request(self, url, status, seconds, size, retries):
+        self._callback("request", {"url": url, "status": status, "seconds": seconds, "size": size,
+                                   "retries": retries})
+
+    def parse(self, page, seconds):
+        self._callback("parse", {"page": page, "seconds": seconds})
+
+    def cache(self, name, hit):
+        self._callback("cache", {"name": name, "hit": hit})
+
+    def download(self, url, size, seconds):
+        self._callback("download", {"url": url, "size": size, "seconds": seconds})
+
+
+class _Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = defaultdict(lambda: [0] * len(self.buckets))
+        self.sums = defaultdict(float)
+        self.totals = defaultdict(int)
+
+    def observe(self, labels, value):
+        counts = self.counts[labels]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        self.sums[labels] += value
+        self.totals[labels] += 1
+
+
+class PrometheusMetrics(Instrumentation):
+    """
+    An instrumentation aggregating the events in counters and histograms, rendered in the Prometheus text format.
+    """
+
+    _PREFIX = "mobile_assistant_360_"
+
+    _SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    _THROUGHPUT_BUCKETS = tuple(mib * (1 << 20) for mib in (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100))
+
+    _HELP = {
+        "requests_total": ("counter", "Requests by status code, 0 for failed requests"),
+        "request_seconds": ("histogram", "Time until the response of each request"),
+        "response_bytes_total": ("counter", "Bytes of the non streamed response bodies"),
+        "retries_total": ("counter", "Retries of the requests"),
+        "parse_seconds": ("histogram", "Parse duration per page type"),
+        "cache_lookups_total": ("counter", "Cache lookups by cache and result"),
+        "downloads_total": ("counter", "Completed APK transfers"),
+        "download_bytes_total": ("counter", "Bytes of the completed APK transfers"),
+        "download_seconds": ("histogram", "Duration of each APK transfer"),
+        "download_bytes_per_second": ("histogram", "Throughput of each APK transfer"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(float))
+        self._histograms = {
+            "request_seconds": _Histogram(self._SECONDS_BUCKETS),
+            "parse_seconds": _Histogram(self._SECONDS_BUCKETS),
+            "download_seconds": _Histogram(self._SECONDS_BUCKETS),
+            "download_bytes_per_second": _Histogram(self._THROUGHPUT_BUCKETS),
+        }
+
+    def _increment(self, name, labels=(), value=1):
+        self._counters[name][labels] += value
+
+    def request(self, url, status, seconds, size, retries):
+        with self._lock:
+            self._increment("requests_total", (("status", str(status or 0)),))
+            self._increment("response_bytes_total", value=size)
+            self._increment("retries_total", value=retries)
+            self._histograms["request_seconds"].observe((), seconds)
+
+    def parse(self, page, seconds):
+        with self._lock:
+            self._histograms["parse_seconds"].observe((("page", page),), seconds)
+
+    def cache(self, name, hit):
+        with self._lock:
+            self._increment("cache_lookups_total", (("cache", name), ("result", "hit" if hit else "miss")))
+
+    def download(self, url, size, seconds):
+        with self._lock:
+            self._increment("downloads_total")
+            self._increment("download_bytes_total", value=size)
+            self._histograms["download_seconds"].observe((), seconds)
+            if seconds > 0:
+                self._histograms["download_bytes_per_second"].observe((), size / seconds)
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join("{}=\"{}\"".format(key, value) for key, value in labels) + "}"
+
+    @staticmethod
+    def _format_value(value):
+        return repr(float(value)) if value != int(value) else str(int(value))
+
+    def render(self):
+        """
+        :return: The metrics in the Prometheus text exposition format
+        :rtype: str
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, description) in self._HELP.items():
+                full_name = self._PREFIX + name
+                lines.append("# HELP {} {}".format(full_name, description))
+                lines.append("# TYPE {} {}".format(full_name, kind))
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append("{}{} {}".format(full_name, self._format_labels(labels),
+                                                      self._format_value(value)))
+                    continue
+                histogram = self._histograms[name]
+                for labels in sorted(histogram.totals):
+                    for bound, count in zip(histogram.buckets, histogram.counts[labels]):
+                        lines.append("{}_bucket{} {}".format(
+                            full_name, self._format_labels(labels + (("le", self._format_value(bound)),)), count))
+                    lines.append("{}_bucket{} {}".format(full_name, self._format_labels(labels + (("le", "+Inf"),)),
+                                                         histogram.totals[labels]))
+                    lines.append("{}_sum{} {}".format(full_name, self._format_labels(labels),
+                                                      self._format_value(histogram.sums[labels])))
+                    lines.append("{}_count{} {}".format(full_name, self._format_labels(labels),
+                                                        histogram.totals[labels]))
+        return "\n".join(lines) + "\n"
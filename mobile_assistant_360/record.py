@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+
+from collections.abc import Mapping, MutableMapping
+
+
+class AppRecord(MutableMapping):
+    """
+    A compact application record, with a slot per known field instead of a dict per application.
+    It behaves as a mutable mapping with the keys of the dict output (Name, PackageName, Version, AppId...),
+    unknown keys being kept in a dict allocated only when needed.
+    """
+
+    _KEYS = {
+        "Name": "name",
+        "ApkName": "apk_name",
+        "PackageName": "package_name",
+        "Version": "version",
+        "AppId": "app_id",
+        "Rating": "rating",
+        "Downloads": "downloads",
+        "DownloadLink": "download_link",
+        "Creator": "creator",
+        "Size": "size",
+        "LastUpdate": "last_update",
+        "Bytes": "bytes",
+        "Sha256": "sha256",
+        "Md5": "md5",
+    }
+
+    __slots__ = tuple(_KEYS.values()) + ("_extra",)
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        attribute = self._KEYS.get(key)
+        if attribute is not None:
+            try:
+                return getattr(self, attribute)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        attribute = self._KEYS.get(key)
+        if attribute is not None:
+            setattr(self, attribute, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        attribute = self._KEYS.get(key)
+        if attribute is not None:
+            try:
+                delattr(self, attribute)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        for key, attribute in self._KEYS.items():
+            if hasattr(self, attribute):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        attribute = self._KEYS.get(key)
+        if attribute is not None:
+            return hasattr(self, attribute)
+        return self._extra is not None and key in self._extra
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.to_dict() == dict(other.items())
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
+
+    def update(self, other=(), **kwargs):
+        keys = self._KEYS
+        for mapping in (other, kwargs):
+            items = mapping.items() if isinstance(mapping, (dict, Mapping)) else mapping
+            for key, value in items:
+                attribute = keys.get(key)
+                if attribute is not None:
+                    setattr(self, attribute, value)
+                else:
+                    self[key] = value
+
+    def copy(self):
+        return type(self)(self)
+
+    def to_dict(self):
+        """
+        :return: The record as a dict, as returned before the record type
+        :rtype: dict
+        """
+        return {key: self[key] for key in self}
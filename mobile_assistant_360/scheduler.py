@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+
+import re
+import shutil
+import threading
+from collections.abc import Mapping
+
+
+class DownloadScheduler(object):
+    """
+    The planning of a batch of downloads: the applications repeated with the same package and version or the same
+    url are dropped, the others are ordered by the size expected from their listing, smallest first, and each
+    transfer is only admitted if the disk keeps min_free_space bytes free and the batch stays within max_bytes.
+    The space of the admitted transfers is reserved until they end, so concurrent workers do not overcommit the
+    disk, unknown_size bytes being reserved for an APK whose size is unknown.
+    """
+
+    _APP_PACKAGE = "PackageName"
+    _APP_VERSION = "Version"
+    _APP_LINK = "DownloadLink"
+    _APP_SIZE = "Size"
+    _APP_BYTES = "Bytes"
+
+    _SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)I?B?\s*$", re.IGNORECASE)
+    _UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+    def __init__(self, folder, max_bytes=None, min_free_space=0, unknown_size=64 * (1 << 20)):
+        """
+        :param folder: The download folder, whose file system is checked for free space
+        :type folder: str
+        :param max_bytes: The max number of bytes downloaded by the batch, None for no limit
+        :type max_bytes: int
+        :param min_free_space: The number of bytes kept free on the file system of the download folder
+        :type min_free_space: int
+        :param unknown_size: The number of bytes reserved for an APK whose size is unknown
+        :type unknown_size: int
+        """
+        if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes < 0):
+            raise ValueError("Error: max_bytes must be a positive integer or None")
+        if not isinstance(min_free_space, int) or min_free_space < 0:
+            raise ValueError("Error: min_free_space must be a positive integer")
+        if not isinstance(unknown_size, int) or unknown_size < 0:
+            raise ValueError("Error: unknown_size must be a positive integer")
+        self._folder = folder
+        self._max_bytes = max_bytes
+        self._min_free_space = min_free_space
+        self._unknown_size = unknown_size
+        self._reserved = 0
+        self._downloaded = 0
+        self._lock = threading.Lock()
+
+    @property
+    def downloaded(self):
+        return self._downloaded
+
+    @classmethod
+    def expected_size(cls, application):
+        """
+        :param application: An application, with the Bytes of a previous download or the Size of the store
+        :return: The expected size of its APK in bytes, None if unknown
+        :rtype: int
+        """
+        size = application.get(cls._APP_BYTES)
+        if isinstance(size, int) and size >= 0:
+            return size
+        size = application.get(cls._APP_SIZE)
+        if not isinstance(size, str):
+            return None
+        match = cls._SIZE.match(size)
+        if match is None:
+            return None
+        return int(float(match.group(1)) * cls._UNITS[match.group(2).upper()])
+
+    def plan(self, applications):
+        """
+        Order the applications to download and find the repeated ones.
+
+        :param applications: A list of applications
+        :type applications: list
+        :return: The indexes of the applications in the order to download them, and the indexes of the repeated ones
+        :rtype: tuple
+        """
+        seen = set()
+        jobs = []
+        repeated = []
+        for index, application in enumerate(applications):
+            if not isinstance(application, Mapping):
+                jobs.append(index)
+                continue
+            keys = []
+            package = application.get(self._APP_PACKAGE)
+            version = application.get(self._APP_VERSION)
+            if package is not None and version is not None:
+                keys.append((package, version))
+            if application.get(self._APP_LINK) is not None:
+                keys.append(application[self._APP_LINK])
+            if any(key in seen for key in keys):
+                repeated.append(index)
+                continue
+            seen.update(keys)
+            jobs.append(index)
+        # The applications of unknown size come last, in their input order.
+        sizes = {index: self.expected_size(applications[index])
+                 if isinstance(applications[index], Mapping) else None for index in jobs}
+        jobs.sort(key=lambda index: (sizes[index] is None, sizes[index] or 0))
+        return jobs, repeated
+
+    def admit(self, size):
+        """
+        Reserve the space of a transfer if the disk and the byte budget allow it.
+
+        :param size: The expected size of the APK in bytes, None if unknown
+        :type size: int
+        :return: The number of reserved bytes if the transfer can start, then release must be called when it ends,
+        or None
+        :rtype: int
+        """
+        reserved = size if size is not None else self._unknown_size
+        with self._lock:
+            if self._max_bytes is not None and self._downloaded + self._reserved + reserved > self._max_bytes:
+                return None
+            free = shutil.disk_usage(self._folder).free
+            if free - self._reserved - reserved < self._min_free_space:
+                return None
+            self._reserved += reserved
+        return reserved
+
+    def release(self, reserved, downloaded):
+        """
+        Release the space reserved for a transfer.
+
+        :param reserved: The number of bytes reserved by admit
+        :type reserved: int
+        :param downloaded: The number of bytes actually downloaded, 0 if the transfer failed
+        :type downloaded: int
+        """
+        with self._lock:
+            self._reserved -= reserved
+            self._downloaded += downloaded
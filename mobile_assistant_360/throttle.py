@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+import threading
+import time
+
+
+class ThrottledError(IOError):
+    """
+    Raised when the store still throttles a request after all its retries, instead of dropping the page silently
+    """
+
+
+class RateLimiter(object):
+    """
+    A thread-safe token bucket limiting the number of requests per second shared by several threads
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: The max number of requests per second
+        :type rate: float
+        :param burst: The max number of requests sent at once after an idle period
+        :type burst: int
+        """
+        if rate <= 0:
+            raise ValueError("Error: rate must be positive")
+        if burst < 1:
+            raise ValueError("Error: burst must be at least 1")
+        self._rate = float(rate)
+        self._burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def acquire(self):
+        """
+        Wait until a request can be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def success(self):
+        """
+        Report a request answered by the server, ignored by a fixed rate limiter.
+        """
+
+    def throttled(self, retry_after=None):
+        """
+        Report a request throttled by the server or timed out, ignored by a fixed rate limiter.
+
+        :param retry_after: The delay requested by the server before the next request, in seconds
+        :type retry_after: float
+        """
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    A rate limiter adapting its rate to the server: the rate is divided on every throttled or timed out request and
+    increased step by step on every answered one, up to the max rate (additive increase, multiplicative decrease).
+    A delay requested by the server with Retry-After pauses every thread sharing the limiter.
+    """
+
+    def __init__(self, rate, min_rate=0.5, burst=1, increase=None, decrease=0.5):
+        """
+        :param rate: The max and initial number of requests per second
+        :type rate: float
+        :param min_rate: The min number of requests per second
+        :type min_rate: float
+        :param burst: The max number of requests sent at once after an idle period
+        :type burst: int
+        :param increase: The rate added on every answered request, a fiftieth of the max rate if None
+        :type increase: float
+        :param decrease: The factor applied to the rate on every throttled request
+        :type decrease: float
+        """
+        super().__init__(rate, burst)
+        if min_rate <= 0 or min_rate > rate:
+            raise ValueError("Error: min_rate must be positive and lower than rate")
+        if not 0 < decrease < 1:
+            raise ValueError("Error: decrease must be between 0 and 1")
+        self._max_rate = float(rate)
+        self._min_rate = float(min_rate)
+        self._increase = float(increase) if increase is not None else self._max_rate / 50
+        self._decrease = decrease
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """
+        Wait until a request can be sent.
+        """
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        super().acquire()
+
+    def success(self):
+        with self._lock:
+            self._rate = min(self._max_rate, self._rate + self._increase)
+
+    def throttled(self, retry_after=None):
+        with self._lock:
+            self._rate = max(self._min_rate, self._rate * self._decrease)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after is not None and retry_after > 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+class CircuitBreaker(object):
+    """
+    A thread-safe circuit breaker pausing the requests while the server keeps throttling them.
+    After failures consecutive throttled or timed out requests, the circuit opens and every thread waits for the
+    pause before a single probe request is sent. An answered probe closes the circuit, a failed one opens it again
+    for a doubled pause.
+    """
+
+    _CLOSED = "closed"
+    _OPEN = "open"
+    _HALF_OPEN = "half-open"
+
+    def __init__(self, failures=5, pause=30.0, max_pause=300.0):
+        """
+        :param failures: The number of consecutive failures opening the circuit
+        :type failures: int
+        :param pause: The first pause of an open circuit, in seconds
+        :type pause: float
+        :param max_pause: The max pause of an open circuit, in seconds
+        :type max_pause: float
+        """
+        if failures < 1:
+            raise ValueError("Error: failures must be at least 1")
+        if pause <= 0 or max_pause < pause:
+            raise ValueError("Error: pause must be positive and lower than max_pause")
+        self._max_failures = failures
+        self._initial_pause = float(pause)
+        self._max_pause = float(max_pause)
+        self._pause = self._initial_pause
+        self._failures = 0
+        self._state = self._CLOSED
+        self._opened_until = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def state(self):
+        return self._state
+
+    def wait(self):
+        """
+        Wait until a request can be sent: immediately when the circuit is closed, after the pause when it is open,
+        and after the answer of the probe when it is half-open.
+        """
+        with self._condition:
+            while True:
+                if self._state == self._CLOSED:
+                    return
+                if self._state == self._OPEN:
+                    remaining = self._opened_until - time.monotonic()
+                    if remaining <= 0:
+                        self._state = self._HALF_OPEN
+                        return
+                    self._condition.wait(remaining)
+                else:
+                    # A probe which is never reported does not block the other threads for more than a pause.
+                    if not self._condition.wait(self._pause) and self._state == self._HALF_OPEN:
+                        return
+
+    def success(self):
+        """
+        Report a request answered by the server.
+        """
+        with self._condition:
+            self._failures = 0
+            if self._state != self._CLOSED:
+                self._state = self._CLOSED
+                self._pause = self._initial_pause
+                self._condition.notify_all()
+
+    def failure(self):
+        """
+        Report a request throttled by the server or timed out.
+        """
+        with self._condition:
+            self._failures += 1
+            if self._state == self._HALF_OPEN:
+                self._pause = min(self._max_pause, self._pause * 2)
+            elif self._state == self._OPEN or self._failures < self._max_failures:
+                return
+            self._state = self._OPEN
+            self._opened_until = time.monotonic() + self._pause
+            self._condition.notify_all()
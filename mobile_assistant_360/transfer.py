@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+
+class ApkTransfer(object):
+    """
+    Download an APK into a temporary file. On failure the partial file is kept with a small sidecar state,
+    so that the next transfer of the same url resumes it with HTTP Range requests when the server supports them.
+    Large files can be split into byte-range segments downloaded in parallel, their size being probed with a request
+    of their first byte.
+    The SHA-256 and MD5 digests of the file are computed while it is streamed.
+    """
+
+    _STATE_SUFFIX = ".state"
+
+    def __init__(self, get, url, path, chunk_size=1 << 20, segments=1, segment_threshold=32 * (1 << 20),
+                 slot=None):
+        """
+        :param get: The function used to send a GET request, with the signature of requests.get
+        :param url: The url of the APK
+        :type url: str
+        :param path: The path of the temporary file
+        :type path: str
+        :param chunk_size: The size of the chunks read from the network
+        :type chunk_size: int
+        :param segments: The number of byte-range segments of a large file downloaded in parallel
+        :type segments: int
+        :param segment_threshold: The min size of a file to split it into segments, in bytes
+        :type segment_threshold: int
+        :param slot: A function returning a context manager held during each request, e.g. to cap the requests
+        sent to a host, so that every segment takes its own slot
+        :type slot: callable
+        """
+        self._get = get
+        self._url = url
+        self._path = path
+        self._state_path = path + self._STATE_SUFFIX
+        self._chunk_size = chunk_size
+        self._segments = segments
+        self._segment_threshold = segment_threshold
+        self._slot = slot if slot is not None else nullcontext
+        self._sha256 = hashlib.sha256()
+        self._md5 = hashlib.md5()
+        self.size = None
+
+    @property
+    def sha256(self):
+        """
+        The hexadecimal SHA-256 digest of the downloaded file
+        """
+        return self._sha256.hexdigest()
+
+    @property
+    def md5(self):
+        """
+        The hexadecimal MD5 digest of the downloaded file
+        """
+        return self._md5.hexdigest()
+
+    def _hash_file(self, size=None):
+        """
+        Hash the first size bytes of the file, used for a resumed or segmented transfer
+        """
+        with open(self._path, "rb") as apk:
+            while size is None or size > 0:
+                chunk = apk.read(self._chunk_size if size is None else min(self._chunk_size, size))
+                if not chunk:
+                    break
+                self._sha256.update(chunk)
+                self._md5.update(chunk)
+                if size is not None:
+                    size -= len(chunk)
+
+    def _load_state(self):
+        try:
+            with open(self._state_path) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict) or state.get("url") != self._url or not os.path.isfile(self._path):
+            return {}
+        return state
+
+    def _save_state(self, state):
+        with open(self._state_path, "w") as file:
+            json.dump(state, file)
+
+    def _clear_state(self):
+        if os.path.exists(self._state_path):
+            os.remove(self._state_path)
+
+    def discard(self):
+        """
+        Remove the partial file and its state.
+        """
+        self._clear_state()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    @staticmethod
+    def _get_content_range(req):
+        """
+        Return the first byte and the total size of a 206 response, the size being None if unknown
+        """
+        content_range = req.headers.get("Content-Range", "")
+        try:
+            unit, value = content_range.split(" ", 1)
+            byte_range, size = value.split("/", 1)
+            start = int(byte_range.split("-", 1)[0])
+            size = int(size) if size != "*" else None
+        except ValueError:
+            return None, None
+        if unit != "bytes":
+            return None, None
+        return start, size
+
+    @staticmethod
+    def _get_validator(state):
+        return state.get("etag") or state.get("last_modified")
+
+    def run(self, label=None):
+        """
+        Download the APK, resuming a previous partial transfer if possible.
+
+        :param label: The label of the progress bar, no progress bar is displayed if None
+        :type label: str
+        :return: The size of the downloaded file
+        :rtype: int
+        :raise IOError: If the transfer fails, the partial file is then kept to be resumed
+        """
+        state = self._load_state()
+        if not state and self._segments > 1:
+            with self._slot(), self._get(self._url, stream=True, headers={"Range": "bytes=0-0"}) as req:
+                if req.status_code == 200:
+                    return self._write_response(req, 0, self._get_content_length(req), label)
+                state = self._probe_segments(req)
+        if state.get("segments"):
+            return self._run_segments(state)
+        offset = os.path.getsize(self._path) if state else 0
+        headers = {}
+        if offset > 0:
+            headers["Range"] = "bytes={}-".format(offset)
+            if self._get_validator(state) is not None:
+                headers["If-Range"] = self._get_validator(state)
+        with self._slot(), self._get(self._url, stream=True, headers=headers) as req:
+            if req.status_code == 416 and offset > 0 and offset == state.get("size"):
+                self._hash_file()
+                self._clear_state()
+                self.size = offset
+                return offset
+            if req.status_code == 206 and offset > 0 and self._get_content_range(req)[0] == offset:
+                size = self._get_content_range(req)[1]
+            elif req.status_code == 200:
+                offset = 0
+                size = self._get_content_length(req)
+            elif req.status_code in (206, 416):
+                self.discard()
+                raise IOError("Unable to resume the transfer of the url {}.".format(self._url))
+            else:
+                raise IOError("Unexpected status code {} for the url {}.".format(req.status_code, self._url))
+            return self._write_response(req, offset, size, label)
+
+    @staticmethod
+    def _get_content_length(req):
+        content_length = req.headers.get("content-length")
+        return int(content_length) if content_length is not None and content_length.isdigit() else None
+
+    def _create_state(self, req, size):
+        return {"url": self._url, "size": size, "etag": req.headers.get("ETag"),
+                "last_modified": req.headers.get("Last-Modified")}
+
+    def _probe_segments(self, req):
+        """
+        Return the state of a segmented transfer from the response to the request of the first byte, or an empty
+        state if the file is too small or its size unknown
+        """
+        if req.status_code != 206:
+            return {}
+        start, size = self._get_content_range(req)
+        if start != 0 or size is None or size < self._segment_threshold:
+            return {}
+        state = self._create_state(req, size)
+        state["segments"] = self._split(size)
+        with open(self._path, "wb") as apk:
+            apk.truncate(size)
+        return state
+
+    def _write_response(self, req, offset, size, label):
+        self._save_state(self._create_state(req, size))
+        return self._write(req, offset, size, label)
+
+    def _write(self, req, offset, size, label):
+        if offset > 0:
+            self._hash_file(offset)
+        sha256_update = self._sha256.update
+        md5_update = self._md5.update
+        with open(self._path, "ab" if offset > 0 else "wb") as apk:
+            write = apk.write
+            chunks = req.iter_content(chunk_size=self._chunk_size)
+            if label is not None and size is not None:
+                from clint.textui import progress
+
+                chunks = progress.bar(chunks, label=label,
+                                      expected_size=(((size - offset) / self._chunk_size) + 1))
+            for chunk in chunks:
+                if chunk:
+                    write(chunk)
+                    sha256_update(chunk)
+                    md5_update(chunk)
+                    offset += len(chunk)
+        if size is not None and offset != size:
+            raise IOError("Incomplete transfer of the url {}: {} of {} bytes.".format(self._url, offset, size))
+        self._clear_state()
+        self.size = offset
+        return offset
+
+    def _split(self, size):
+        step = -(-size // self._segments)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+    def _run_segments(self, state):
+        self._save_state(state)
+        segments = state["segments"]
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [executor.submit(self._fetch_segment, segment, self._get_validator(state))
+                           for segment in segments]
+            for future in futures:
+                future.result()
+        except _ChangedError:
+            self.discard()
+            raise
+        except BaseException:
+            self._save_state(state)
+            raise
+        self._hash_file()
+        self._clear_state()
+        self.size = state["size"]
+        return self.size
+
+    def _fetch_segment(self, segment, validator):
+        start, end, done = segment
+        if start + done > end:
+            return
+        headers = {"Range": "bytes={}-{}".format(start + done, end)}
+        if validator is not None:
+            headers["If-Range"] = validator
+        with self._slot(), self._get(self._url, stream=True, headers=headers) as req:
+            if req.status_code == 200:
+                raise _ChangedError("The file of the url {} has changed.".format(self._url))
+            if req.status_code != 206 or self._get_content_range(req)[0] != start + done:
+                raise IOError("Unexpected status code {} for the url {}.".format(req.status_code, self._url))
+            with open(self._path, "r+b") as apk:
+                apk.seek(start + done)
+                for chunk in req.iter_content(chunk_size=self._chunk_size):
+                    if chunk:
+                        apk.write(chunk[:end + 1 - start - segment[2]])
+                        segment[2] = min(segment[2] + len(chunk), end + 1 - start)
+        if start + segment[2] != end + 1:
+            raise IOError("Incomplete transfer of the url {}.".format(self._url))
+
+
+class _ChangedError(IOError):
+    pass
@@ -15,4 +15,9 @@ setup(name='MobileAssistant360',
           "beautifulsoup4",
           "clint"
       ],
+      extras_require={
+          "lxml": ["lxml"],
+          "async": ["aiohttp"],
+          "parquet": ["pyarrow"]
+      },
      )
\ No newline at end of file
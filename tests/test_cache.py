@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from mobile_assistant_360.cache import DetailsCache, ResponseCache
+from mobile_assistant_360.index import LocalIndex
+
+
+@pytest.mark.parametrize("store", [DetailsCache, ResponseCache, LocalIndex])
+def test_folder_created_after_the_store(tmp_path, store):
+    folder = str(tmp_path / "mirror")
+    database = store(folder)
+    os.makedirs(folder)
+    assert len(database) == 0
+    database.close()
+    assert os.path.isfile(os.path.join(folder, store._FILE_NAME))
+
+
+@pytest.mark.parametrize("store", [DetailsCache, ResponseCache, LocalIndex])
+def test_path_ending_with_a_separator_is_a_folder(tmp_path, store):
+    folder = os.path.join(str(tmp_path), "mirror") + os.sep
+    database = store(folder)
+    assert len(database) == 0
+    database.close()
+    assert os.path.isfile(os.path.join(folder, store._FILE_NAME))
+
+
+def test_details_are_kept_in_the_folder(tmp_path):
+    cache = DetailsCache(str(tmp_path))
+    cache.set("1", {"Version": "1.0"})
+    cache.close()
+    cache = DetailsCache(str(tmp_path))
+    assert cache.get("1") == {"Version": "1.0"}
+    assert cache.hits == 1
+    cache.close()
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from mobile_assistant_360.manifest import Manifest
+
+DOWNLOADED = {"AppId": "1", "Name": "App", "ApkName": "com.example.app_1.apk", "Version": "1.0", "Bytes": 1024,
+              "Sha256": "a" * 64, "Md5": "b" * 32}
+CRAWLED = {"AppId": "1", "Name": "App renamed", "ApkName": "com.example.app_1.apk", "Version": "1.0",
+           "Rating": "8.0"}
+
+
+def test_later_record_is_merged_into_the_download(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.jsonl"))
+    manifest.append([DOWNLOADED, CRAWLED])
+    assert manifest.load() == [dict(DOWNLOADED, Name="App renamed", Rating="8.0")]
+    manifest.close()
+
+
+@pytest.mark.parametrize("compact_format", ["parquet", "arrow"])
+def test_compaction_keeps_the_download_metadata(tmp_path, compact_format):
+    pytest.importorskip("pyarrow")
+    manifest = Manifest(str(tmp_path / "manifest.jsonl"), compact_format)
+    other = {"AppId": "2", "Name": "Other", "ApkName": "com.example.other_3.apk"}
+    manifest.append([DOWNLOADED, other])
+    assert manifest.compact() == 2
+    manifest.append([CRAWLED])
+    assert manifest.compact() == 2
+    assert manifest.load() == [other, dict(DOWNLOADED, Name="App renamed", Rating="8.0")]
+
+
+def test_folder_created_after_the_manifest(tmp_path):
+    folder = str(tmp_path / "mirror")
+    manifest = Manifest(folder)
+    assert manifest.load() == []
+    os.makedirs(folder)
+    manifest.append([DOWNLOADED])
+    manifest.close()
+    assert os.path.isfile(os.path.join(folder, ".mobile_assistant_360_manifest.jsonl"))
+    assert Manifest(folder).load() == [DOWNLOADED]
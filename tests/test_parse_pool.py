@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mobile_assistant_360.market import MobileAssistant360
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks", "fixtures")
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+PAGES = [
+    (MobileAssistant360._parse_search_page, "search_page.html", ()),
+    (MobileAssistant360._parse_search_page, "search_empty.html", ()),
+    (MobileAssistant360._parse_category_page, "category_page.html", (1,)),
+    (MobileAssistant360._parse_category_page, "category_empty.html", (2,)),
+    (MobileAssistant360._parse_categories, "categories.html", ("http://zhushou.360.cn/list/index/cid/1",)),
+    (MobileAssistant360._parse_details, "detail_wechat.html", ()),
+    (MobileAssistant360._parse_details, "detail_minimal.html", ()),
+]
+
+
+@pytest.fixture(scope="module")
+def pages():
+    return [(parse, _read(name), args) for parse, name, args in PAGES]
+
+
+@pytest.fixture(scope="module")
+def pooled():
+    market = MobileAssistant360(parse_workers=2)
+    yield market
+    market.close()
+
+
+def _parse_all(market, pages):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        return list(executor.map(lambda page: market._parse(page[0], page[1], *page[2]), pages * 3))
+
+
+def test_pooled_parsing_matches_inline_parsing(pages, pooled):
+    expected = _parse_all(MobileAssistant360(), pages)
+    assert any(expected)
+    assert _parse_all(pooled, pages) == expected
+
+
+@pytest.mark.parametrize("index", range(len(PAGES)), ids=[name for _, name, _ in PAGES])
+def test_pooled_parsing_of_each_page(pages, pooled, index):
+    parse, html, args = pages[index]
+    assert pooled._parse(parse, html, *args) == MobileAssistant360()._parse(parse, html, *args)
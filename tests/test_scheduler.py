@@ -0,0 +1,103 @@
+import collections
+
+import pytest
+
+from mobile_assistant_360 import scheduler as scheduler_module
+from mobile_assistant_360.scheduler import DownloadScheduler
+
+_Usage = collections.namedtuple("_Usage", ["total", "used", "free"])
+
+
+@pytest.fixture
+def free_space(monkeypatch):
+    space = {"free": 1 << 30}
+    monkeypatch.setattr(scheduler_module.shutil, "disk_usage", lambda folder: _Usage(1 << 40, 0, space["free"]))
+    return space
+
+
+def _app(name, size=None, package=None, version=None, link=None):
+    application = {"Name": name}
+    if size is not None:
+        application["Size"] = size
+    if package is not None:
+        application["PackageName"] = package
+    if version is not None:
+        application["Version"] = version
+    if link is not None:
+        application["DownloadLink"] = link
+    return application
+
+
+@pytest.mark.parametrize("application, size", [
+    ({"Size": "12.5M"}, int(12.5 * (1 << 20))),
+    ({"Size": "800K"}, 800 << 10),
+    ({"Size": "1.2G"}, int(1.2 * (1 << 30))),
+    ({"Size": "10 MB"}, 10 << 20),
+    ({"Size": "512"}, 512),
+    ({"Bytes": 1000, "Size": "1M"}, 1000),
+    ({"Size": "unknown"}, None),
+    ({}, None),
+])
+def test_expected_size(application, size):
+    assert DownloadScheduler.expected_size(application) == size
+
+
+def test_plan_drops_the_same_package_and_version():
+    applications = [_app("a", package="com.a", version="1"), _app("b", package="com.a", version="2"),
+                    _app("c", package="com.a", version="1")]
+    assert DownloadScheduler("/").plan(applications) == ([0, 1], [2])
+
+
+def test_plan_drops_the_same_url():
+    applications = [_app("a", link="http://store/a.apk"),
+                    _app("b", package="com.b", version="1", link="http://store/a.apk"),
+                    _app("c", link="http://store/c.apk")]
+    assert DownloadScheduler("/").plan(applications) == ([0, 2], [1])
+
+
+def test_plan_orders_by_size_with_unknown_sizes_last():
+    applications = [_app("a"), _app("b", size="2M"), "not an application", _app("c", size="300K"),
+                    _app("d", size="?"), _app("e", size="1M")]
+    jobs, repeated = DownloadScheduler("/").plan(applications)
+    assert jobs == [3, 5, 1, 0, 2, 4]
+    assert repeated == []
+
+
+def test_admit_within_max_bytes(free_space):
+    scheduler = DownloadScheduler("/", max_bytes=1000)
+    assert scheduler.admit(600) == 600
+    assert scheduler.admit(500) is None
+    assert scheduler.admit(400) == 400
+    scheduler.release(600, 550)
+    scheduler.release(400, 0)
+    assert scheduler.downloaded == 550
+    assert scheduler.admit(500) is None
+    assert scheduler.admit(450) == 450
+
+
+def test_admit_reserves_unknown_size(free_space):
+    scheduler = DownloadScheduler("/", max_bytes=1000, unknown_size=700)
+    assert scheduler.admit(None) == 700
+    assert scheduler.admit(400) is None
+    scheduler.release(700, 100)
+    assert scheduler.admit(None) == 700
+    assert scheduler.admit(None) is None
+
+
+def test_admit_keeps_min_free_space(free_space):
+    free_space["free"] = 10000
+    scheduler = DownloadScheduler("/", min_free_space=4000)
+    assert scheduler.admit(5000) == 5000
+    # The reserved space of the running transfer is not free yet.
+    assert scheduler.admit(2000) is None
+    assert scheduler.admit(1000) == 1000
+    scheduler.release(5000, 5000)
+    free_space["free"] = 5000
+    assert scheduler.admit(1000) is None
+    assert scheduler.admit(None) is None
+
+
+@pytest.mark.parametrize("options", [{"max_bytes": -1}, {"min_free_space": -1}, {"unknown_size": 1.5}])
+def test_invalid_options(options):
+    with pytest.raises(ValueError):
+        DownloadScheduler("/", **options)
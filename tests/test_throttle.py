@@ -0,0 +1,83 @@
+import http.server
+import os
+import threading
+
+import pytest
+
+from mobile_assistant_360.market import MobileAssistant360
+from mobile_assistant_360.throttle import AdaptiveRateLimiter, ThrottledError
+
+APK = b"PK\x03\x04" + bytes(range(256)) * 16
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/detail/index/soft_id/1":
+            # The detail page of the second application stays throttled, alternating the two status codes.
+            self.server.throttled += 1
+            self.send_response(503 if self.server.throttled % 2 else 429)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/detail/"):
+            self._send(b"<html><body></body></html>")
+            return
+        if self.path.startswith("/apk/"):
+            self._send(APK)
+            return
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, body):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.throttled = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _applications(url, count):
+    return [{"AppId": str(index), "Name": "App {}".format(index), "PackageName": "com.example.app{}".format(index),
+             "DownloadLink": "{}/apk/com.example.app{}_1.apk".format(url, index)} for index in range(count)]
+
+
+def test_throttled_details_skip_their_applications(server, tmp_path, capsys):
+    url = "http://127.0.0.1:{}".format(server.server_address[1])
+    market = MobileAssistant360(download_folder=str(tmp_path), base_url=url, retries=0, prefetch=1,
+                                rate_limiter=AdaptiveRateLimiter(1000, min_rate=500), throttle_retries=2)
+    results = market.download(_applications(url, 3), workers=2, progress=None)
+    assert server.throttled == 3
+    assert "App 1" in capsys.readouterr().err
+    assert [application["AppId"] for application in results] == ["0", "2"]
+    for application in results:
+        assert application["Bytes"] == len(APK)
+        with open(os.path.join(str(tmp_path), application["PackageName"], application["ApkName"]), "rb") as apk:
+            assert apk.read() == APK
+    assert not os.listdir(os.path.join(str(tmp_path), "com.example.app1"))
+    assert not os.path.exists(os.path.join(str(tmp_path), "tmp"))
+
+
+def test_throttled_details_raise_from_get_details(server, tmp_path):
+    url = "http://127.0.0.1:{}".format(server.server_address[1])
+    market = MobileAssistant360(download_folder=str(tmp_path), base_url=url, retries=0,
+                                rate_limiter=AdaptiveRateLimiter(1000, min_rate=500), throttle_retries=1)
+    with pytest.raises(ThrottledError):
+        market.get_details("1")
+    assert server.throttled == 2
@@ -0,0 +1,186 @@
+import hashlib
+import http.server
+import os
+import re
+import threading
+
+import pytest
+import requests
+
+from mobile_assistant_360.transfer import ApkTransfer
+
+DATA = bytes(range(256)) * 1024
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.headers.get("Range"), self.headers.get("If-Range")))
+        data = server.data
+        start, end = 0, len(data) - 1
+        partial = False
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+        if_range = self.headers.get("If-Range")
+        if match and server.ranges and (if_range is None or if_range == server.etag):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{}".format(len(data)))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            end = min(end, len(data) - 1)
+            partial = True
+        body = data[start:end + 1]
+        self.send_response(206 if partial else 200)
+        if partial:
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, end, len(data)))
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.drop_after is not None:
+            # Send the first bytes only, then close the connection as a network failure would.
+            self.wfile.write(body[:server.drop_after])
+            self.wfile.flush()
+            server.drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.data = DATA
+    server.etag = "\"v1\""
+    server.ranges = True
+    server.drop_after = None
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+def _transfer(server, session, path, **kwargs):
+    url = "http://127.0.0.1:{}/app.apk".format(server.server_address[1])
+    return ApkTransfer(session.get, url, path, chunk_size=4096, **kwargs)
+
+
+def _check(transfer, path, data):
+    with open(path, "rb") as apk:
+        assert apk.read() == data
+    assert transfer.size == len(data)
+    assert transfer.sha256 == hashlib.sha256(data).hexdigest()
+    assert transfer.md5 == hashlib.md5(data).hexdigest()
+    assert not os.path.exists(path + ".state")
+
+
+def test_dropped_connection_is_resumed(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    server.drop_after = 100000
+    with pytest.raises(IOError):
+        _transfer(server, session, path).run()
+    offset = os.path.getsize(path)
+    assert 0 < offset <= 100000
+    assert os.path.exists(path + ".state")
+    transfer = _transfer(server, session, path)
+    transfer.run()
+    _check(transfer, path, DATA)
+    assert server.requests[-1] == ("bytes={}-".format(offset), "\"v1\"")
+
+
+def test_changed_file_is_downloaded_again(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    server.drop_after = 100000
+    with pytest.raises(IOError):
+        _transfer(server, session, path).run()
+    server.data = bytes(reversed(DATA))
+    server.etag = "\"v2\""
+    transfer = _transfer(server, session, path)
+    transfer.run()
+    _check(transfer, path, server.data)
+
+
+def test_resume_without_range_support_restarts(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    server.ranges = False
+    server.drop_after = 100000
+    with pytest.raises(IOError):
+        _transfer(server, session, path).run()
+    transfer = _transfer(server, session, path)
+    transfer.run()
+    _check(transfer, path, DATA)
+
+
+def test_segments_without_range_support_use_the_probe_response(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    server.ranges = False
+    transfer = _transfer(server, session, path, segments=4, segment_threshold=1024)
+    transfer.run()
+    _check(transfer, path, DATA)
+    assert len(server.requests) == 1
+
+
+def test_segmented_transfer(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    transfer = _transfer(server, session, path, segments=4, segment_threshold=1024)
+    transfer.run()
+    _check(transfer, path, DATA)
+    ranges = sorted(request[0] for request in server.requests)
+    assert ranges == ["bytes=0-0", "bytes=0-65535", "bytes=131072-196607", "bytes=196608-262143",
+                      "bytes=65536-131071"]
+
+
+def test_small_file_is_not_segmented(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    transfer = _transfer(server, session, path, segments=4, segment_threshold=len(DATA) + 1)
+    transfer.run()
+    _check(transfer, path, DATA)
+    assert [request[0] for request in server.requests] == ["bytes=0-0", None]
+
+
+def test_complete_partial_file_is_kept(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    with open(path, "wb") as apk:
+        apk.write(DATA)
+    with open(path + ".state", "w") as state:
+        state.write("{{\"url\": \"http://127.0.0.1:{}/app.apk\", \"size\": {}, \"etag\": \"\\\"v1\\\"\"}}"
+                    .format(server.server_address[1], len(DATA)))
+    transfer = _transfer(server, session, path)
+    transfer.run()
+    _check(transfer, path, DATA)
+    assert server.requests == [("bytes={}-".format(len(DATA)), "\"v1\"")]
+
+
+def test_missing_file_raises_without_partial_file(server, session, tmp_path):
+    path = str(tmp_path / "app.apk")
+    url = "http://127.0.0.1:{}/missing.apk".format(server.server_address[1])
+    server.RequestHandlerClass = _NotFoundHandler
+    with pytest.raises(IOError):
+        ApkTransfer(session.get, url, path).run()
+    assert not os.path.exists(path)
+
+
+class _NotFoundHandler(_Handler):
+
+    def do_GET(self):
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()